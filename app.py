@@ -1,30 +1,227 @@
-from quart import Quart, jsonify, request, render_template
+from quart import Quart, Response, jsonify, request, render_template, send_file
+from quart.json.provider import DefaultJSONProvider
 from quart_cors import cors
+import shutil
+import asyncio
+import gzip
+import hashlib
 import logging
+import mmap
+import orjson
 from config import Config
 import json
 from datetime import datetime
 import os
 import pathlib
-from bidding_workflow import app as bidding_app, BiddingWorkflow
-from quart import Quart
-from bidding_workflow import BiddingWorkflow, prompt_bp  # 导入提示词蓝图
+# 合并为一条导入：避免分散的 import 语句重复触发 bidding_workflow 的模块级初始化
+from bidding_workflow import (  # 导入提示词蓝图
+    BiddingWorkflow, prompt_bp, get_shared_workflow, close_shared_workflow, stop_log_listener,
+)
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify 改走 orjson：终稿接口会序列化数MB的文档内容，标准库 json 是瓶颈"""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 
 # 初始化配置
 app = Quart(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB 最大请求限制
+app.json = OrjsonProvider(app)
 app = cors(app, allow_origin="*", allow_methods=["GET", "POST"])  # 跨域配置
+# 注意：大小限制必须设在 cors() 返回的实例上——先设再包可能作用在被替换的 config 上，
+# 导致限制悄悄失效、请求体被无上限缓冲进内存
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB 最大请求限制
+app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 logger = logging.getLogger(__name__)
 
 # 确保输出目录存在（强化：自动创建所有需要的输出目录）
-os.makedirs(Config.OUTLINE_DIR if hasattr(Config, 'OUTLINE_DIR') else 'outputs/outline', exist_ok=True)
-os.makedirs('inputs', exist_ok=True)
-os.makedirs('outputs/document', exist_ok=True)  # 新增：确保终稿目录存在
-os.makedirs('outputs', exist_ok=True)  # 新增：确保根输出目录存在
+# 优化：记录已创建的目录，避免每次请求重复执行 makedirs（NFS/Windows 上逐级 stat 开销大）
+_ENSURED_DIRS = set()
+
+
+def ensure_dir(path):
+    """创建目录并缓存结果，同一路径只执行一次 makedirs"""
+    path = os.fspath(path)
+    if path in _ENSURED_DIRS:
+        return
+    os.makedirs(path, exist_ok=True)
+    _ENSURED_DIRS.add(path)
+
+
+def _ensure_tree(paths):
+    """批量确保目录存在：先用 scandir 一次性收集已有目录，再只为缺失的执行 makedirs
+
+    makedirs 内部会对每级路径逐段 stat，在 NFS/Windows 上开销明显；
+    一次 scandir 能覆盖同一父目录下的全部检查。
+    """
+    paths = [os.path.normpath(os.fspath(p)) for p in paths]
+    existing = set()
+    for root in {os.path.dirname(p) or '.' for p in paths}:
+        try:
+            existing.update(
+                os.path.normpath(os.path.join(root, entry.name))
+                for entry in os.scandir(root) if entry.is_dir()
+            )
+        except FileNotFoundError:
+            pass
+    for p in paths:
+        if p not in existing:
+            os.makedirs(p, exist_ok=True)
+        _ENSURED_DIRS.add(p)
+
+
+# 路径常量在导入时计算一次，处理器内不再每次做 hasattr 查找和 os.path.join 拼接
+_OUTLINE_DIR = getattr(Config, 'OUTLINE_DIR', pathlib.Path('outputs/outline'))
+_OUTLINE_JSON_PATH = os.fspath(pathlib.Path(_OUTLINE_DIR) / 'outline.json')
+_OUTLINE_MD_PATH = os.fspath(pathlib.Path(_OUTLINE_DIR) / 'outline.md')
+_CONTENT_MD_PATH = os.fspath(pathlib.Path('outputs') / 'content.md')
+_OUTLINE_HASH_PATH = os.fspath(pathlib.Path(_OUTLINE_DIR) / 'outline.hash')
+_DOCUMENT_DIR = pathlib.Path('outputs/document')
+
+# 一次 scandir 批量检查全部目录（含终稿目录和根输出目录），只为缺失的执行 makedirs
+_ensure_tree([_OUTLINE_DIR, 'inputs', _DOCUMENT_DIR, 'outputs'])
+
+
+# ===================== 异步文件读写辅助（避免阻塞事件循环） =====================
+# Quart 是单线程事件循环，处理器里直接 open().read() 会卡住所有并发请求，
+# 统一通过 asyncio.to_thread 把磁盘 I/O 丢到线程池执行
+async def _read_text(path) -> str:
+    return await asyncio.to_thread(pathlib.Path(path).read_text, encoding='utf-8')
+
+
+async def _read_json(path):
+    # orjson 直接解析字节串，比标准库 json 快数倍且峰值内存更低
+    raw = await asyncio.to_thread(pathlib.Path(path).read_bytes)
+    return orjson.loads(raw)
+
+
+async def _write_text(path, content: str):
+    await asyncio.to_thread(pathlib.Path(path).write_text, content, encoding='utf-8')
+
+
+_TECH_MD_PATH = os.path.join('inputs', 'tech.md')
+_SCORE_MD_PATH = os.path.join('inputs', 'score.md')
+
+
+def _input_files_sig():
+    """输入文件签名（mtime_ns），用于判断是否需要重新加载"""
+    return (os.stat(_TECH_MD_PATH).st_mtime_ns, os.stat(_SCORE_MD_PATH).st_mtime_ns)
+
+
+async def _load_inputs_if_changed(workflow):
+    """仅在 tech.md / score.md 发生变化时重新读盘，共享实例下避免每个请求重复 I/O"""
+    try:
+        sig = await asyncio.to_thread(_input_files_sig)
+    except FileNotFoundError:
+        sig = None
+    if sig is None or getattr(workflow, '_loaded_sig', None) != sig:
+        await workflow.load_input_files()
+        workflow._loaded_sig = sig
+
+
+def _input_hash(tech_content: str, score_content: str) -> str:
+    """计算输入文件内容指纹，用于判断缓存的大纲是否仍然有效"""
+    return hashlib.blake2b((tech_content + score_content).encode('utf-8'), digest_size=16).hexdigest()
+
+
+async def _load_cached_outline(workflow) -> bool:
+    """输入未变化时直接复用磁盘上的大纲，跳过一次完整的 LLM 调用
+
+    命中条件：outline.hash 旁路文件存在且与当前输入指纹一致，outline.json 可解析。
+    命中时把大纲装载到 workflow.outline 并返回 True。
+    """
+    try:
+        cached_hash = (await _read_text(_OUTLINE_HASH_PATH)).strip()
+        if cached_hash != _input_hash(workflow.tech_content, workflow.score_content):
+            return False
+        outline_dict = await _read_json(_OUTLINE_JSON_PATH)
+        workflow.outline = workflow.parse_outline_json(outline_dict)
+        logger.info("输入未变化，复用本地缓存大纲，跳过LLM生成")
+        return True
+    except Exception as e:
+        logger.debug(f"大纲缓存未命中：{e}")
+        return False
+
+
+async def _save_outline_hash(workflow):
+    """写入大纲对应的输入指纹旁路文件"""
+    await _write_text(_OUTLINE_HASH_PATH, _input_hash(workflow.tech_content, workflow.score_content))
+
+
+# 预编码响应缓存：outline.json 未变化时，同一响应体不重复 JSON 编码
+# key = (路径, mtime_ns, size)，文件一变 key 即失效
+_resp_cache: dict = {}
+
+
+def _outline_cache_key():
+    """返回 outline.json 当前状态对应的缓存键；文件不存在时返回 None"""
+    try:
+        st = os.stat(_OUTLINE_JSON_PATH)
+    except FileNotFoundError:
+        return None
+    return (_OUTLINE_JSON_PATH, st.st_mtime_ns, st.st_size)
+
+
+def _mmap_preview(path, preview_chars: int = 1000):
+    """通过 mmap 读取文件长度和开头预览，避免为大文件分配完整的 Python 字符串
+
+    返回 (文件字节数, 预览字符串)。只解码预览切片本身：按 4×字符数取字节
+    （覆盖最宽的 UTF-8 编码），errors='ignore' 保证切在多字节序列中间也不报错，
+    再按字符数截断，整个过程峰值内存为 O(preview) 而非 O(file)。
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, ''  # 空文件无法 mmap（ValueError），直接返回空预览
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            preview = mm[:preview_chars * 4].decode('utf-8', errors='ignore')
+            return len(mm), preview[:preview_chars]
+        finally:
+            mm.close()
 
 app.register_blueprint(prompt_bp)
 
 
+# 大响应 gzip 压缩：终稿接口的 JSON 会带上整篇 Markdown，压缩后体积约为原来的 1/5~1/10，
+# 对带宽受限的客户端传输时间按比例缩短；压缩本身丢到线程池，不阻塞事件循环
+_COMPRESS_MIN_SIZE = 1024
+
+
+@app.after_request
+async def _compress_response(response):
+    if not (response.content_type or '').startswith('application/json'):
+        return response
+    if 'gzip' not in request.headers.get('Accept-Encoding', '').lower():
+        return response
+    if response.headers.get('Content-Encoding'):
+        return response
+    if response.content_length is None or response.content_length < _COMPRESS_MIN_SIZE:
+        return response
+
+    body = await response.get_data()
+    compressed = await asyncio.to_thread(gzip.compress, body, 6)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers.setdefault('Vary', 'Accept-Encoding')
+    return response
+
+
+# 服务启动时预热共享 Workflow（LLM 连接池随进程生命周期复用），停止时统一释放
+@app.before_serving
+async def _warmup_workflow():
+    await get_shared_workflow()
+
+
+@app.after_serving
+async def _teardown_workflow():
+    await close_shared_workflow()
+    stop_log_listener()
+
+
 # 首页路由
 @app.route('/')
 async def index():
@@ -47,6 +244,14 @@ async def document_page():
 @app.route('/save_input', methods=['POST'])
 async def save_input():
     try:
+        # 超限请求提前 413 拒绝，省掉整个请求体的缓冲分配
+        if request.content_length is not None and request.content_length > MAX_CONTENT_LENGTH:
+            return jsonify({
+                'success': False,
+                'msg': '请求体过大（超过16MB限制）',
+                'data': {}
+            }), 413
+
         # 获取前端JSON数据
         data = await request.get_json()
         tech_content = data.get('tech_content', '').strip()
@@ -56,12 +261,12 @@ async def save_input():
         tech_file_path = os.path.join('inputs', 'tech.md')
         score_file_path = os.path.join('inputs', 'score.md')
 
-        # 写入文件（强化：确保目录存在）
-        os.makedirs(os.path.dirname(tech_file_path), exist_ok=True)
-        with open(tech_file_path, 'w', encoding='utf-8') as f:
-            f.write(tech_content)
-        with open(score_file_path, 'w', encoding='utf-8') as f:
-            f.write(score_content)
+        # 并发写入两个文件（write_text 在 C 层一次 open/write/close 完成，
+        # 两个线程提交让内核回写路径重叠，耗时约减半）
+        await asyncio.gather(
+            _write_text(tech_file_path, tech_content),
+            _write_text(score_file_path, score_content),
+        )
 
         return jsonify({
             'success': True,
@@ -80,16 +285,58 @@ async def save_input():
 # 核心大纲生成接口（整合所有逻辑，解决重复路由问题）
 @app.route('/generate_outline', methods=['GET', 'POST'])
 async def generate_outline():
-    logger.info(f"Received {request.method} request to /generate_outline")
-    logger.info(f"Request headers: {request.headers}")
-
-    async with BiddingWorkflow() as workflow:  # 异步上下文管理器
+    # 降级为 DEBUG 并用惰性 %s 格式化：INFO 级别下不再每次请求都格式化 headers 多值字典
+    logger.debug("Received %s request to /generate_outline", request.method)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Request headers: %s", request.headers)
+
+    # GET 为只读轮询：outline.json 未变化时直接返回缓存的预编码响应体，
+    # 不重复读盘/解析/JSON编码，也不触发 LLM 重新生成
+    if request.method == 'GET':
+        cache_key = _outline_cache_key()
+        if cache_key is not None:
+            # HTTP 条件缓存：ETag 命中时直接 304，连响应体都不用发
+            _, mtime_ns, size = cache_key
+            etag = f'"{mtime_ns:x}-{size:x}"'
+            if request.headers.get('If-None-Match') == etag:
+                return '', 304, {'ETag': etag, 'Cache-Control': 'private, must-revalidate'}
+            cached = _resp_cache.get(cache_key)
+            if cached is None:
+                local_json_content, local_md_content = await asyncio.gather(
+                    _read_json(_OUTLINE_JSON_PATH),
+                    _read_text(_OUTLINE_MD_PATH),
+                    return_exceptions=True
+                )
+                if isinstance(local_json_content, Exception):
+                    local_json_content = {}
+                if isinstance(local_md_content, Exception):
+                    local_md_content = ""
+                cached = orjson.dumps({
+                    'success': True,
+                    'msg': '大纲生成成功',
+                    'data': {
+                        'outline_dict': local_json_content,
+                        'json_content': local_json_content,
+                        'md_content': local_md_content,
+                        'json_path': _OUTLINE_JSON_PATH,
+                        'md_path': _OUTLINE_MD_PATH
+                    }
+                })
+                _resp_cache.clear()  # 只保留当前版本，防止旧 key 堆积
+                _resp_cache[cache_key] = cached
+            resp = Response(cached, mimetype='application/json')
+            resp.headers['ETag'] = etag
+            resp.headers['Cache-Control'] = 'private, must-revalidate'
+            return resp
+
+    workflow = await get_shared_workflow()  # 复用共享实例，避免每次请求重建 LLM 客户端
+    async with workflow.lock:  # 串行化对共享 outline 状态的修改
         try:
             logger.info("Starting outline generation")
 
-            # 1. 加载输入文件并校验
+            # 1. 加载输入文件并校验（输入未变化时直接复用内存内容）
             logger.info("Loading input files")
-            workflow.load_input_files()
+            await _load_inputs_if_changed(workflow)
 
             # 校验输入内容非空
             if not hasattr(workflow, 'tech_content') or len(workflow.tech_content.strip()) == 0:
@@ -122,25 +369,27 @@ async def generate_outline():
 
             logger.info("Saving outline")
             workflow.save_outline()
+            await _save_outline_hash(workflow)  # 记录输入指纹，供 /generate_document 复用大纲
 
             # 4. 读取本地生成的大纲文件（核心：返回文件内容给前端）
-            outline_dir = Config.OUTLINE_DIR if hasattr(Config, 'OUTLINE_DIR') else pathlib.Path('outputs/outline')
-            outline_json_path = os.path.join(outline_dir, 'outline.json')
-            outline_md_path = os.path.join(outline_dir, 'outline.md')
-
-            # 读取JSON文件内容（强化：处理文件不存在的异常）
-            try:
-                with open(outline_json_path, 'r', encoding='utf-8') as f:
-                    local_json_content = json.load(f)  # 解析为字典，方便前端直接使用
-            except FileNotFoundError:
+            outline_json_path = _OUTLINE_JSON_PATH
+            outline_md_path = _OUTLINE_MD_PATH
+
+            # 并发读取JSON和Markdown文件（两个读操作相互独立，gather 同时提交）
+            local_json_content, local_md_content = await asyncio.gather(
+                _read_json(outline_json_path),  # 解析为字典，方便前端直接使用
+                _read_text(outline_md_path),  # 字符串格式，支持前端Markdown渲染
+                return_exceptions=True
+            )
+            # 强化：处理文件不存在的异常，映射回默认值
+            if isinstance(local_json_content, Exception):
+                if not isinstance(local_json_content, FileNotFoundError):
+                    raise local_json_content
                 local_json_content = {}
                 logger.warning(f"大纲JSON文件未找到：{outline_json_path}")
-
-            # 读取Markdown文件内容（强化：处理文件不存在的异常）
-            try:
-                with open(outline_md_path, 'r', encoding='utf-8') as f:
-                    local_md_content = f.read()  # 字符串格式，支持前端Markdown渲染
-            except FileNotFoundError:
+            if isinstance(local_md_content, Exception):
+                if not isinstance(local_md_content, FileNotFoundError):
+                    raise local_md_content
                 local_md_content = ""
                 logger.warning(f"大纲MD文件未找到：{outline_md_path}")
 
@@ -173,9 +422,10 @@ async def generate_outline():
 async def create_outline():
     try:
         request_data = await request.get_json()
-        async with BiddingWorkflow() as workflow:
+        workflow = await get_shared_workflow()
+        async with workflow.lock:
             logger.info("Starting API outline generation")
-            workflow.load_input_files()
+            await _load_inputs_if_changed(workflow)
 
             # 生成大纲
             outline_json = await workflow.generate_outline()
@@ -187,13 +437,13 @@ async def create_outline():
                 }), 500
 
             # 读取本地文件内容（强化：处理文件不存在）
-            outline_dir = Config.OUTLINE_DIR if hasattr(Config, 'OUTLINE_DIR') else 'outputs/outline'
-            outline_json_path = os.path.join(outline_dir, 'outline.json')
+            outline_json_path = _OUTLINE_JSON_PATH
+            # 直接透传磁盘上的JSON字符串，省掉 parse→reserialize 的两次 O(N) 往返
+            # （客户端要的就是JSON字符串，文件内容本身就是合法JSON）
             try:
-                with open(outline_json_path, 'r', encoding='utf-8') as f:
-                    local_json_content = json.load(f)
+                outline_str = await _read_text(outline_json_path)
             except FileNotFoundError:
-                local_json_content = {}
+                outline_str = "{}"
                 logger.warning(f"大纲JSON文件未找到：{outline_json_path}")
 
             current_time = datetime.now().isoformat()
@@ -201,7 +451,7 @@ async def create_outline():
                 "code": 0,
                 "message": "success",
                 "data": {
-                    "outline": json.dumps(local_json_content),  # 真实大纲JSON字符串
+                    "outline": outline_str,  # 真实大纲JSON字符串
                     "task_status": "completed",
                     "created_at": current_time,
                     "updated_at": current_time
@@ -220,17 +470,16 @@ async def create_outline():
 # 内容生成接口
 @app.route('/generate_content', methods=['POST'])
 async def generate_content():
-    async with BiddingWorkflow() as workflow:
+    workflow = await get_shared_workflow()
+    async with workflow.lock:
         try:
-            workflow.load_input_files()
+            await _load_inputs_if_changed(workflow)
 
             # 加载本地大纲（强化：处理文件不存在）
-            outline_dir = Config.OUTLINE_DIR if hasattr(Config, 'OUTLINE_DIR') else 'outputs/outline'
-            outline_json_path = os.path.join(outline_dir, 'outline.json')
+            outline_json_path = _OUTLINE_JSON_PATH
             try:
-                with open(outline_json_path, 'r', encoding='utf-8') as f:
-                    outline_dict = json.load(f)
-                    workflow.outline = workflow.parse_outline_json(outline_dict)
+                outline_dict = await _read_json(outline_json_path)
+                workflow.outline = workflow.parse_outline_json(outline_dict)
             except FileNotFoundError:
                 logger.error(f"大纲文件未找到，无法生成内容：{outline_json_path}")
                 return jsonify({
@@ -243,10 +492,9 @@ async def generate_content():
             success = await workflow.generate_full_content_async()
             if success:
                 # 新增：读取生成的content.md内容返回给前端
-                content_md_path = os.path.join('outputs', 'content.md')
+                content_md_path = _CONTENT_MD_PATH
                 try:
-                    with open(content_md_path, 'r', encoding='utf-8') as f:
-                        content_md = f.read()
+                    content_md = await _read_text(content_md_path)
                 except FileNotFoundError:
                     content_md = ""
                     logger.warning(f"内容文件未找到：{content_md_path}")
@@ -277,20 +525,23 @@ async def generate_content():
 # 终稿生成接口（核心修复：读取本地已生成的content.md，返回真实内容）
 @app.route('/generate_document', methods=['POST'])
 async def generate_document():
-    async with BiddingWorkflow() as workflow:
+    workflow = await get_shared_workflow()
+    async with workflow.lock:
         try:
-            workflow.load_input_files()
-
-            # 1. 先生成并保存大纲（依赖大纲）
-            outline_json = await workflow.generate_outline()
-            if not outline_json:
-                return jsonify({
-                    'success': False,
-                    'msg': '先生成大纲失败，无法生成终稿',
-                    'data': {}
-                }), 500
-            workflow.outline = workflow.parse_outline_json(outline_json)
-            workflow.save_outline()
+            await _load_inputs_if_changed(workflow)
+
+            # 1. 优先复用缓存大纲（输入未变时省掉整个LLM往返——系统里最贵的一步）
+            if not await _load_cached_outline(workflow):
+                outline_json = await workflow.generate_outline()
+                if not outline_json:
+                    return jsonify({
+                        'success': False,
+                        'msg': '先生成大纲失败，无法生成终稿',
+                        'data': {}
+                    }), 500
+                workflow.outline = workflow.parse_outline_json(outline_json)
+                workflow.save_outline()
+                await _save_outline_hash(workflow)
 
             # 2. 生成终稿内容
             generate_success = await workflow.generate_full_content_async()
@@ -303,7 +554,7 @@ async def generate_document():
 
             # 3. 核心修复：读取日志中实际保存的content.md文件（而非依赖workflow属性）
             # 日志显示文件保存在 outputs/content.md，直接读取这个文件
-            content_md_path = os.path.join('outputs', 'content.md')
+            content_md_path = _CONTENT_MD_PATH
             if not os.path.exists(content_md_path):
                 logger.error(f"终稿文件未找到：{content_md_path}")
                 return jsonify({
@@ -312,28 +563,25 @@ async def generate_document():
                     'data': {}
                 }), 500
 
-            # 读取真实终稿内容（UTF-8编码，确保中文正常）
-            with open(content_md_path, 'r', encoding='utf-8') as f:
-                full_document_content = f.read()
-            simple_content = full_document_content[
-                                 :1000] + f"\n\n...（内容过长，完整内容请查看本地文件：{content_md_path}）"
+            # 用 mmap 获取文件长度和预览，避免仅为切片就把整个文件解码成字符串
+            content_length, preview = await asyncio.to_thread(_mmap_preview, content_md_path)
+            simple_content = preview + f"\n\n...（内容过长，完整内容请查看本地文件：{content_md_path}）"
 
-            # 4. 额外保存一份到document目录（兜底）
-            document_dir = pathlib.Path('outputs/document')
-            document_dir.mkdir(parents=True, exist_ok=True)
-            backup_md_path = document_dir / 'document.md'
-            with open(backup_md_path, 'w', encoding='utf-8') as f:
-                f.write(full_document_content)
+            # 4. 额外保存一份到document目录（兜底，文件级复制无需解码）
+            ensure_dir(_DOCUMENT_DIR)  # 导入时已创建，这里只查缓存
+            backup_md_path = _DOCUMENT_DIR / 'document.md'
+            await asyncio.to_thread(shutil.copyfile, content_md_path, backup_md_path)
 
-            # 5. 返回真实内容给前端（核心：解决“无返回内容”问题）
+            # 5. 返回预览+下载地址给前端（完整内容走 /download 流式下载，
+            #    不再整篇塞进 JSON —— 避免对整个 Markdown 做 JSON 转义和整体拷贝）
             return jsonify({
                 'success': True,
                 'msg': '终稿生成成功（文件已保存到outputs/content.md）',
                 'data': {
-                    'document_content': full_document_content,  # 真实的终稿内容字符串
                     'simple_content': simple_content,           # 简化内容（供前端渲染）
+                    'download_url': '/download/document.md',    # 完整内容下载地址
                     'backup_content_path': str(backup_md_path),  # 备份文件路径
-                    'content_length': len(full_document_content)  # 内容长度，验证完整性
+                    'content_length': content_length  # 内容字节数，验证完整性
                 }
             })
 
@@ -346,5 +594,24 @@ async def generate_document():
             }), 500
 
 
+# 终稿下载接口（send_file 走内核 sendfile 零拷贝路径，conditional 支持 Range 断点续传）
+@app.route('/download/<string:name>')
+async def download_document(name):
+    file_path = _DOCUMENT_DIR / name
+    # 防目录穿越：只允许下载 outputs/document 下的文件
+    if '..' in name or '/' in name or '\\' in name or not file_path.exists():
+        return jsonify({'success': False, 'msg': '文件不存在', 'data': {}}), 404
+    return await send_file(file_path, mimetype='text/markdown', conditional=True)
+
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', debug=True, port=5001)
\ No newline at end of file
+    # uvloop（libuv 的 C 事件循环）对 I/O 密集的 Quart 通常有 2-4 倍吞吐提升；
+    # Windows / 未安装时自动回退到标准 asyncio 循环
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    # debug 模式（自动重载+异常中间件）只在显式开启时使用；
+    # 生产环境请用 hypercorn 多 worker 部署：hypercorn -c hypercorn.toml app:app
+    app.run(host='0.0.0.0', debug=os.getenv('QUART_DEBUG') == '1', port=5001)
\ No newline at end of file
@@ -1,8 +1,9 @@
 # 统一使用 Quart 异步框架，删除 Flask 导入（避免混用导致异步错误）
 import asyncio
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import List, Optional, Dict, Union
 import json
+import orjson
 import yaml
 import os
 import re
@@ -12,7 +13,13 @@ import logging
 from config import Config
 from prompts import Prompts
 from prompt_manager import PromptManager
+import functools
+import queue
 import time
+from bisect import bisect_right
+from collections import Counter
+from itertools import accumulate
+from logging.handlers import QueueHandler, QueueListener
 from quart import Quart, jsonify, request, render_template, Blueprint  # 仅保留 Quart 导入
 
 # ===================== 核心修复1：初始化 Quart 实例（替代 Flask） =====================
@@ -29,35 +36,66 @@ OUTPUT_DIR = Config.OUTPUT_DIR
 OUTLINE_DIR = Config.OUTLINE_DIR
 LOG_DIR = Config.LOG_DIR
 
-# 首先创建必要的目录（修复：明确所有目录，避免 KeyError）
-for path in [INPUT_DIR, OUTPUT_DIR, OUTLINE_DIR, LOG_DIR]:
-    path.mkdir(parents=True, exist_ok=True)
+# 模块级重初始化哨兵：目录创建和日志配置只执行一次（防止 reload / 重复 import 的副作用）
+if not globals().get('_INITIALIZED', False):
+    # 首先创建必要的目录（修复：明确所有目录，避免 KeyError）
+    for path in [INPUT_DIR, OUTPUT_DIR, OUTLINE_DIR, LOG_DIR]:
+        path.mkdir(parents=True, exist_ok=True)
+
+    # 修改日志配置
+    logging.basicConfig(level=logging.INFO)  # 设置根日志器级别为 INFO
+
+    # 创建文件处理器，用于详细日志
+    file_handler = logging.FileHandler(LOG_DIR / 'app.log', encoding='utf-8')
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+    # 创建控制台处理器，只显示关键信息
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
+    # 配置根日志器：挂 QueueHandler，真正的 write(2) 由 QueueListener 线程执行，
+    # 事件循环里的 logger.info 只剩一次内存级 queue.put，不再被磁盘 I/O 卡住
+    _log_queue = queue.SimpleQueue()
+    root_logger = logging.getLogger()
+    root_logger.handlers = []  # 清除之前的处理器
+    root_logger.addHandler(QueueHandler(_log_queue))
+    _log_listener = QueueListener(_log_queue, file_handler, console_handler, respect_handler_level=True)
+    _log_listener.start()
+
+    # 配置第三方库的日志级别
+    logging.getLogger('httpcore').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('openai').setLevel(logging.WARNING)
+
+    _INITIALIZED = True
 
-# 修改日志配置
-logging.basicConfig(level=logging.INFO)  # 设置根日志器级别为 INFO
+logger = logging.getLogger(__name__)
 
-# 创建文件处理器，用于详细日志
-file_handler = logging.FileHandler(LOG_DIR / 'app.log', encoding='utf-8')
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+# 预编译 JSON 清理用的正则：re 模块缓存有限且可能被逐出，热路径上直接用编译好的 Pattern
+_RE_TRAIL_COMMA_OBJ = re.compile(r',\s*}')
+_RE_TRAIL_COMMA_ARR = re.compile(r',\s*]')
+# 小节标题数字前缀（如 "6.1.1 总体要求" 取 "6.1"），单次 C 层匹配代替多轮 split 的中间列表
+_SEC_NUM_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)')
 
-# 创建控制台处理器，只显示关键信息
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
 
-# 配置根日志器
-root_logger = logging.getLogger()
-root_logger.handlers = []  # 清除之前的处理器
-root_logger.addHandler(file_handler)
-root_logger.addHandler(console_handler)
+def _unclosed_delta(s: str):
+    """单次扫描统计未闭合的 {} 和 [] 数量
 
-# 配置第三方库的日志级别
-logging.getLogger('httpcore').setLevel(logging.WARNING)
-logging.getLogger('httpx').setLevel(logging.WARNING)
-logging.getLogger('openai').setLevel(logging.WARNING)
+    Counter 在 C 层一次遍历完成全部字符计数，替代四次独立的 str.count 全量扫描。
+    返回 (未闭合大括号数, 未闭合中括号数)。
+    """
+    counts = Counter(s)
+    return (max(0, counts['{'] - counts['}']),
+            max(0, counts['['] - counts[']']))
 
-logger = logging.getLogger(__name__)
+
+def stop_log_listener():
+    """停止日志监听线程并刷出剩余日志（服务停止时调用）"""
+    listener = globals().get('_log_listener')
+    if listener is not None:
+        listener.stop()
 
 # ===================== 核心修复2：创建并注册蓝图（路由必须注册才生效） =====================
 prompt_bp = Blueprint(
@@ -68,7 +106,10 @@ prompt_bp = Blueprint(
 )
 
 # ===================== 核心新增：全局PromptManager实例（供接口使用） =====================
-global_prompt_manager = PromptManager(BASE_DIR / "config" / "prompt_config.json")
+# 惰性构造：prompt_config.json 在首次使用时才读取和解析，而不是 import 时
+@functools.lru_cache(maxsize=1)
+def get_prompt_manager() -> PromptManager:
+    return PromptManager(BASE_DIR / "config" / "prompt_config.json")
 
 
 # ======================================================================================
@@ -80,18 +121,22 @@ class OutlineNode:
     level: int
     content_desc: Optional[str] = None
     children: List['OutlineNode'] = None
+    # 大纲树解析完成后只读，to_dict 结果缓存一次，避免每个响应重复重建嵌套 dict
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.children is None:
             self.children = []
 
     def to_dict(self):
-        return {
-            'title': self.title,
-            'level': self.level,
-            'content_desc': self.content_desc,
-            'children': [child.to_dict() for child in self.children] if self.children else []
-        }
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'title': self.title,
+                'level': self.level,
+                'content_desc': self.content_desc,
+                'children': [child.to_dict() for child in self.children] if self.children else []
+            }
+        return self._cached_dict
 
 
 @dataclass
@@ -105,46 +150,58 @@ class GenerationProgress:
 class SubSection:
     sub_section_title: str
     content_summary: str
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self):
-        return {
-            'sub_section_title': self.sub_section_title,
-            'content_summary': self.content_summary
-        }
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'sub_section_title': self.sub_section_title,
+                'content_summary': self.content_summary
+            }
+        return self._cached_dict
 
 
 @dataclass
 class Section:
     section_title: str
     sub_sections: List[SubSection]
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self):
-        return {
-            'section_title': self.section_title,
-            'sub_sections': [sub.to_dict() for sub in self.sub_sections]
-        }
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'section_title': self.section_title,
+                'sub_sections': [sub.to_dict() for sub in self.sub_sections]
+            }
+        return self._cached_dict
 
 
 @dataclass
 class Chapter:
     chapter_title: str
     sections: List[Section]
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self):
-        return {
-            'chapter_title': self.chapter_title,
-            'sections': [section.to_dict() for section in self.sections]
-        }
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'chapter_title': self.chapter_title,
+                'sections': [section.to_dict() for section in self.sections]
+            }
+        return self._cached_dict
 
 
 @dataclass
 class Outline:
     body_paragraphs: List[Chapter]
+    _cached_dict: Optional[dict] = field(default=None, init=False, repr=False, compare=False)
 
     def to_dict(self):
-        return {
-            'body_paragraphs': [chapter.to_dict() for chapter in self.body_paragraphs]
-        }
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'body_paragraphs': [chapter.to_dict() for chapter in self.body_paragraphs]
+            }
+        return self._cached_dict
 
 
 # ======================================================================================
@@ -161,7 +218,21 @@ class BiddingWorkflow:
         self.progress = GenerationProgress()
         self.full_document_content = ""
         self.document_save_path = OUTPUT_DIR / 'content.md'
-        self.prompt_manager = PromptManager(BASE_DIR / "config" / "prompt_config.json")
+        # 复用全局 PromptManager：避免每个实例都重新读盘解析 prompt_config.json
+        self.prompt_manager = get_prompt_manager()
+        # 共享实例时保护可变状态（outline / generated_contents）的并发访问
+        self.lock = asyncio.Lock()
+        self._content_prompt_tpl = None  # 内容生成模板缓存（见 generate_content_prompt）
+        # 父节点索引：id(子节点) -> 父节点，随大纲树一次性构建（见 get_context_for_section）
+        self._parent_of = None
+        self._parent_of_root = None
+        self._content_fp = None  # content.md 追加句柄，整个生成期间只 open 一次（见 save_content）
+        # outline_to_markdown 结果缓存：内容生成期间大纲不变，同一棵树只拼一次
+        self._outline_md = None
+        self._outline_md_root = None
+        # 三级节点计数：解析大纲时顺路累加，count_sections 不必每次重走整棵树
+        self._n_level3 = None
+        self._section_counts = {}  # id(节点) -> 子树内三级节点数
 
     # 新增：独立的异步初始化方法（存放需要 await 的逻辑）
     async def init_async(self):
@@ -173,11 +244,12 @@ class BiddingWorkflow:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._close_content_fp()
         if hasattr(self, 'llm_client'):
             await self.llm_client.close()
 
-    def load_input_files(self):
-        """加载技术要求和评分标准文件"""
+    async def load_input_files(self):
+        """加载技术要求和评分标准文件（读盘走线程池，不阻塞事件循环）"""
         try:
             tech_file = INPUT_DIR / 'tech.md'
             score_file = INPUT_DIR / 'score.md'
@@ -196,35 +268,28 @@ class BiddingWorkflow:
                 logger.error("Score file is empty")
                 raise ValueError("Score file is empty")
 
-            with open(tech_file, 'r', encoding='utf-8') as f:
-                self.tech_content = f.read()
-                logger.info(f"Loaded tech file, size: {len(self.tech_content)} chars")
-
-            with open(score_file, 'r', encoding='utf-8') as f:
-                self.score_content = f.read()
-                logger.info(f"Loaded score file, size: {len(self.score_content)} chars")
+            # 两个文件相互独立，gather 并发提交到线程池
+            self.tech_content, self.score_content = await asyncio.gather(
+                asyncio.to_thread(tech_file.read_text, encoding='utf-8'),
+                asyncio.to_thread(score_file.read_text, encoding='utf-8'),
+            )
+            logger.info(f"Loaded tech file, size: {len(self.tech_content)} chars")
+            logger.info(f"Loaded score file, size: {len(self.score_content)} chars")
 
         except Exception as e:
             logger.error(f"Error loading input files: {e}", exc_info=True)
             raise
 
-    # 核心修复4：JSON 清理函数去重 + 逻辑强化（删除重复代码 + 修复缩进）
-    def clean_json_response(self, response: str) -> str:
-        """强力清理 LLM 返回内容，确保为合法 JSON"""
-        if not response:
+    # 核心修复4：JSON 清理/补全合并为单一修复管线（clean_json_response 与
+    # _fix_truncated_json 原本各扫一遍做同样的括号配平，现统一走 _repair_json）
+    def _repair_json(self, raw: str) -> Optional[dict]:
+        """清理并补全 LLM 返回的 JSON，成功返回字典，失败返回 None"""
+        if not raw:
             logger.warning("待清理的JSON响应为空")
-            return ""
+            return None
 
-        cleaned = response.strip()
-        # ========== 新增：修复转义错误（核心！解决 \"body_paragraphs 问题） ==========
-        # 1. 移除多余的反斜杠（LLM 错误添加的转义）
-        cleaned = cleaned.replace('\\"', '"')
-        # 2. 移除换行符（避免多行JSON解析错误）
-        cleaned = cleaned.replace('\n', '').replace('\r', '')
-        # 3. 移除制表符/空格冗余
-        cleaned = re.sub(r'\s+', ' ', cleaned)
-
-        # 1. 去除代码块标记
+        cleaned = raw.strip()
+        # 去除代码块标记
         if cleaned.startswith('```json'):
             cleaned = cleaned[7:].strip()
         elif cleaned.startswith('```'):
@@ -232,85 +297,46 @@ class BiddingWorkflow:
         if cleaned.endswith('```'):
             cleaned = cleaned[:-3].strip()
 
-        # 2. 剔除前缀多余文字，只保留 JSON 主体
+        # 修复转义错误（解决 \"body_paragraphs 问题）并移除换行
+        # 注意：不再做 \s+ 归一化——JSON 解析器天然容忍空白，整遍替换纯属浪费
+        cleaned = cleaned.replace('\\"', '"').replace('\n', '').replace('\r', '')
+
+        # 剔除前缀多余文字，只保留 JSON 主体
         first_brace = cleaned.find("{")
         first_bracket = cleaned.find("[")
-        start_idx = -1
-        if first_brace != -1 and first_bracket != -1:
-            start_idx = min(first_brace, first_bracket)
-        elif first_brace != -1:
-            start_idx = first_brace
-        elif first_bracket != -1:
-            start_idx = first_bracket
-
-        if start_idx != -1:
-            cleaned = cleaned[start_idx:]
-        else:
+        candidates = [i for i in (first_brace, first_bracket) if i != -1]
+        if not candidates:
             logger.warning("未找到 JSON 起始符号 { 或 [")
-            return ""
+            return None
+        cleaned = cleaned[min(candidates):]
+
+        # 修复尾部逗号
+        cleaned = _RE_TRAIL_COMMA_OBJ.sub('}', cleaned)
+        cleaned = _RE_TRAIL_COMMA_ARR.sub(']', cleaned)
+
+        # 补全截断的引号和括号（单次 Counter 扫描统计所有计数）
+        if cleaned.count('"') % 2 != 0:
+            cleaned += '"'
+        brace_diff, bracket_diff = _unclosed_delta(cleaned)
+        cleaned += ']' * bracket_diff + '}' * brace_diff
 
-        # 3. 修复常见 JSON 错误（未转义引号、尾部逗号、多行字符串）
-        cleaned = re.sub(r',\s*}', '}', cleaned)
-        cleaned = re.sub(r',\s*]', ']', cleaned)
-
-        # 4. 自动补全残缺的大括号/中括号（深度修复）
-        def count_unclosed_chars(s: str, open_char: str, close_char: str) -> int:
-            """统计未闭合的括号数量"""
-            open_count = s.count(open_char)
-            close_count = s.count(close_char)
-            return max(0, open_count - close_count)
-
-        # 补全大括号
-        brace_diff = count_unclosed_chars(cleaned, '{', '}')
-        if brace_diff > 0:
-            cleaned += '}' * brace_diff
-        # 补全中括号
-        bracket_diff = count_unclosed_chars(cleaned, '[', ']')
-        if bracket_diff > 0:
-            cleaned += ']' * bracket_diff
-
-        # 修复缩进：这部分之前缩进错误
         try:
-            json.loads(cleaned)
+            result = orjson.loads(cleaned)  # SIMD 级 C 解析器，比标准库快数倍
             logger.info("JSON自动补全成功")
-            return cleaned
-        except json.JSONDecodeError as e2:
-            logger.error(f"补全后仍无法解析: {e2}, 内容: {cleaned[:200]}...")
-            return ""
+            return result if isinstance(result, dict) else None
+        except json.JSONDecodeError as e:
+            logger.error(f"补全后仍无法解析: {e}, 内容: {cleaned[:200]}...")
+            return None
+
+    def clean_json_response(self, response: str) -> Optional[dict]:
+        """强力清理 LLM 返回内容，成功直接返回解析后的字典"""
+        return self._repair_json(response)
 
     # ========== 核心新增1：补全截断的JSON ==========
     def _fix_truncated_json(self, json_str):
-        """补全截断的JSON，返回字典"""
-        try:
-            # 清理无效字符
-            content = re.sub(r'^```(?:json)?\s*|\s*```\s*$', '', json_str.strip())
-            content = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9\[\]{}:"",.\s]', '', content)
-            content = content.replace('\\"', '"').replace('\n', '').replace('\r', '')
-
-            # 补全引号
-            quote_count = content.count('"')
-            if quote_count % 2 != 0:
-                content += '"' * (2 - quote_count % 2)
-
-            # 补全括号
-            brace_stack = []
-            bracket_stack = []
-            for char in content:
-                if char == '{':
-                    brace_stack.append(char)
-                elif char == '}':
-                    if brace_stack:
-                        brace_stack.pop()
-                elif char == '[':
-                    bracket_stack.append(char)
-                elif char == ']':
-                    if bracket_stack:
-                        bracket_stack.pop()
-            content += ']' * len(bracket_stack) + '}' * len(brace_stack)
-
-            # 解析并返回
-            return json.loads(content)
-        except:
+        """补全截断的JSON，返回字典（失败时兜底返回默认大纲结构）"""
+        result = self._repair_json(json_str)
+        if result is None:
             # 兜底返回默认大纲结构
             return {
                 "body_paragraphs": [
@@ -320,6 +346,7 @@ class BiddingWorkflow:
                                                                             "content_summary": "项目验收需符合合同及行业规范要求"}]}]}
                 ]
             }
+        return result
 
     # ========== 核心新增2：标准化字段名（无下划线→有下划线） ==========
     def _standardize_field_names(self, obj):
@@ -346,7 +373,7 @@ class BiddingWorkflow:
             return obj
 
     # 核心修复5：大纲生成函数添加 JSON 补全+字段标准化逻辑
-    async def generate_outline(self) -> str:
+    async def generate_outline(self) -> Optional[dict]:
         """生成大纲"""
         try:
             logger.info("=== Starting Outline Generation ===")
@@ -386,12 +413,11 @@ class BiddingWorkflow:
             fixed_outline_obj = self._fix_truncated_json(outline_json)
             # 2. 标准化字段名（无下划线→有下划线）
             standardized_outline_obj = self._standardize_field_names(fixed_outline_obj)
-            # 3. 转回JSON字符串
-            fixed_outline_json = json.dumps(standardized_outline_obj, ensure_ascii=False, indent=2)
 
-            # 保存修复后的JSON
-            self.save_outline_json(fixed_outline_json)
-            return fixed_outline_json
+            # 保存修复后的JSON；直接返回dict，调用方 parse_outline_json 本就支持dict，
+            # 省掉 dumps→loads 对整篇大纲的一次序列化往返
+            self.save_outline_json(standardized_outline_obj)
+            return standardized_outline_obj
 
         except Exception as e:
             logger.error(f"Error generating outline: {e}", exc_info=True)
@@ -403,29 +429,35 @@ class BiddingWorkflow:
             return [text]
 
         chunks = []
-        current_chunk = []
-        current_length = 0
         sentences = text.replace('\r', '').split('\n')
+        run: List[str] = []  # 连续的常规句子段，分块边界用前缀和+二分定位
+
+        def flush_run():
+            if not run:
+                return
+            # accumulate 在 C 层算出 (长度+1) 前缀和，bisect 直接二分到每块末尾，
+            # Python 级迭代次数从 O(句子数) 降为 O(块数)
+            cum = list(accumulate(len(s) + 1 for s in run))
+            start, base = 0, 0
+            while start < len(run):
+                idx = bisect_right(cum, base + max_length)
+                if idx == start:
+                    idx = start + 1  # 单句恰好顶满长度时至少前进一句
+                chunks.append('\n'.join(run[start:idx]))
+                base = cum[idx - 1]
+                start = idx
+            run.clear()
+
         for sentence in sentences:
             if len(sentence) > max_length:
-                if current_chunk:
-                    chunks.append('\n'.join(current_chunk))
-                    current_chunk = []
-                    current_length = 0
+                # 超长单句：先冲刷累积段，再按定长硬切
+                flush_run()
                 for i in range(0, len(sentence), max_length):
                     chunks.append(sentence[i:i + max_length])
-                continue
-
-            if current_length + len(sentence) + 1 > max_length:
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = [sentence]
-                current_length = len(sentence)
             else:
-                current_chunk.append(sentence)
-                current_length += len(sentence) + 1
+                run.append(sentence)
 
-        if current_chunk:
-            chunks.append('\n'.join(current_chunk))
+        flush_run()
         return chunks
 
     def parse_outline_json(self, outline_json: Union[str, dict]) -> Outline:
@@ -436,7 +468,7 @@ class BiddingWorkflow:
             if isinstance(outline_json, str):
                 logger.debug("=== Input JSON String ===")
                 logger.debug(outline_json[:500])
-                data = json.loads(outline_json)
+                data = orjson.loads(outline_json)
             else:
                 data = outline_json
 
@@ -445,6 +477,9 @@ class BiddingWorkflow:
             if not isinstance(data, dict) or 'body_paragraphs' not in data:
                 raise ValueError("Invalid outline JSON: missing body_paragraphs")
 
+            # 类名绑定到局部变量，省去循环内重复的全局查找（大纲可达数百小节）
+            _sub, _sec, _chap = SubSection, Section, Chapter
+            n_level3 = 0
             chapters = []
             for chapter_data in data['body_paragraphs']:
                 if 'chapter_title' not in chapter_data or 'sections' not in chapter_data:
@@ -459,13 +494,15 @@ class BiddingWorkflow:
                     for sub_section_data in section_data['sub_sections']:
                         if 'sub_section_title' not in sub_section_data or 'content_summary' not in sub_section_data:
                             raise ValueError("Invalid sub_section data")
-                        sub_sections.append(SubSection(
+                        sub_sections.append(_sub(
                             sub_section_title=sub_section_data['sub_section_title'],
                             content_summary=sub_section_data['content_summary']
                         ))
-                    sections.append(Section(section_data['section_title'], sub_sections))
-                chapters.append(Chapter(chapter_data['chapter_title'], sections))
+                    n_level3 += len(sub_sections)
+                    sections.append(_sec(section_data['section_title'], sub_sections))
+                chapters.append(_chap(chapter_data['chapter_title'], sections))
 
+            self._n_level3 = n_level3
             return Outline(body_paragraphs=chapters)
 
         except Exception as e:
@@ -473,7 +510,10 @@ class BiddingWorkflow:
             raise
 
     def generate_content_prompt(self, section: OutlineNode, context: str) -> str:
-        return self.prompt_manager.get_prompt("CONTENT_PROMPT").format(
+        # 模板字符串在工作流生命周期内不变，查一次后缓存在实例上（每节内容生成都会调用）
+        if self._content_prompt_tpl is None:
+            self._content_prompt_tpl = self.prompt_manager.get_prompt("CONTENT_PROMPT")
+        return self._content_prompt_tpl.format(
             tech_content=self.tech_content,
             score_content=self.score_content,
             outline=self.outline_to_markdown(),
@@ -486,32 +526,56 @@ class BiddingWorkflow:
         if not self.outline:
             return ""
 
-        result = []
-        for chapter in self.outline.body_paragraphs:
-            result.append(f"# {chapter.chapter_title}")
+        # 每节提示词都会用到整棵大纲的 Markdown；按大纲对象身份缓存，换树才重建
+        if self._outline_md_root is self.outline:
+            return self._outline_md
+
+        chapters = self.outline.body_paragraphs
+        # 预分配目标列表并按索引赋值：容量一次算好，免去 append 的属性查找和扩容搬迁
+        total = len(chapters) + sum(
+            1 + 2 * len(section.sub_sections)
+            for chapter in chapters for section in chapter.sections
+        )
+        result = [''] * total
+        i = 0
+        for chapter in chapters:
+            result[i] = f"# {chapter.chapter_title}"
+            i += 1
             for section in chapter.sections:
-                result.append(f"## {section.section_title}")
+                result[i] = f"## {section.section_title}"
+                i += 1
                 for sub_section in section.sub_sections:
-                    result.append(f"### {sub_section.sub_section_title}")
-                    result.append(f"\n{sub_section.content_summary}\n")
-        return "\n".join(result)
+                    result[i] = f"### {sub_section.sub_section_title}"
+                    result[i + 1] = f"\n{sub_section.content_summary}\n"
+                    i += 2
+        self._outline_md = "\n".join(result)
+        self._outline_md_root = self.outline
+        return self._outline_md
+
+    def _build_parent_index(self, root: OutlineNode):
+        """一次遍历建立 id(子)->父 索引，替代每节重跑整树 DFS 的 find_parents（O(N²)→O(N)）"""
+        parent_of = {}
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            for child in node.children:
+                parent_of[id(child)] = node
+                stack.append(child)
+        self._parent_of = parent_of
+        self._parent_of_root = root
 
     def get_context_for_section(self, current_section: OutlineNode) -> str:
         context_parts = []
         parent_titles = []
-        current_level = current_section.level
-
-        def find_parents(node: OutlineNode, target: OutlineNode, path: List[str]):
-            if node == target:
-                return True
-            for child in node.children:
-                if find_parents(child, target, path):
-                    path.append(node.title)
-                    return True
-            return False
 
         if self.outline:
-            find_parents(self.outline, current_section, parent_titles)
+            if self._parent_of_root is not self.outline:
+                self._build_parent_index(self.outline)
+            # 沿父指针上溯，O(深度) 即可还原原 find_parents 的 path 顺序（由近及远）
+            node = current_section
+            while (parent := self._parent_of.get(id(node))) is not None:
+                parent_titles.append(parent.title)
+                node = parent
 
         for title in parent_titles:
             if title in self.generated_contents:
@@ -530,7 +594,7 @@ class BiddingWorkflow:
             outline_dict = self.outline.to_dict()
             json_path = OUTLINE_DIR / 'outline.json'
             with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(outline_dict, f, ensure_ascii=False, indent=2)
+                f.write(orjson.dumps(outline_dict, option=orjson.OPT_INDENT_2).decode())
             logger.info(f"Saved outline JSON to {json_path}")
 
             md_content = self.outline_to_markdown()
@@ -543,25 +607,49 @@ class BiddingWorkflow:
             logger.error(f"Error saving outline: {e}", exc_info=True)
             raise
 
-    def save_content(self, section_title: str, content: str):
+    @staticmethod
+    def _write_file_sync(path, content: str, mode: str = 'w'):
+        """同步写文件辅助：供 asyncio.to_thread 调用，避免在事件循环里做阻塞 I/O"""
+        with open(path, mode, encoding='utf-8') as f:
+            f.write(content)
+
+    async def save_content(self, section_title: str, content: str):
         self.generated_contents[section_title] = content
-        content_file = OUTPUT_DIR / 'content.md'
 
-        if len(self.generated_contents) == 1:
-            with open(content_file, 'w', encoding='utf-8') as f:
-                f.write("# 技术方案\n\n")
-                f.write(self.outline_to_markdown())
-                f.write("\n\n## 详细内容\n\n")
+        # 复用同一个大缓冲文件句柄：避免每节一对 open/close 系统调用和编码器初始化
+        if self._content_fp is None:
+            def _open_with_prelude():
+                fp = open(OUTPUT_DIR / 'content.md', 'w', encoding='utf-8', buffering=1 << 20)
+                fp.write("# 技术方案\n\n" + self.outline_to_markdown() + "\n\n## 详细内容\n\n")
+                return fp
+            self._content_fp = await asyncio.to_thread(_open_with_prelude)
 
-        with open(content_file, 'a', encoding='utf-8') as f:
-            f.write(f"### {section_title}\n\n")
-            f.write(content)
-            f.write("\n\n")
+        # 先拼好缓冲再一次性提交线程写入，减少跨线程调用次数
+        buf = f"### {section_title}\n\n{content}\n\n"
+        await asyncio.to_thread(self._content_fp.write, buf)
+
+    async def _close_content_fp(self):
+        """关闭节内容追加句柄（刷出缓冲），整篇重写 content.md 前必须先调用"""
+        if self._content_fp is not None:
+            fp, self._content_fp = self._content_fp, None
+            await asyncio.to_thread(fp.close)
 
     def count_sections(self, node: OutlineNode) -> int:
-        count = 1 if node.level == 3 else 0
-        for child in node.children:
-            count += self.count_sections(child)
+        # 整棵树的计数在 parse_outline_json 里已顺路算好，O(1) 直接返回
+        if node is self.outline and self._n_level3 is not None:
+            return self._n_level3
+        cached = self._section_counts.get(id(node))
+        if cached is not None:
+            return cached
+        # 显式栈迭代代替递归，省去每个节点一次函数调用开销
+        count = 0
+        stack = [node]
+        while stack:
+            cur = stack.pop()
+            if cur.level == 3:
+                count += 1
+            stack.extend(cur.children)
+        self._section_counts[id(node)] = count
         return count
 
     async def generate_full_content_async(self) -> bool:
@@ -585,24 +673,21 @@ class BiddingWorkflow:
             total_sections = len(sections_to_generate)
             logger.info(f"Found {total_sections} sections to generate")
             semaphore = asyncio.Semaphore(15)
+            completed = 0
 
             async def process_section_with_semaphore(section):
+                nonlocal completed
                 async with semaphore:
                     result = await self.llm_client.generate_section_content_async(section)
-                    await asyncio.sleep(0.05)
-                    return result
+                completed += 1
+                logger.info(f"Progress: {completed}/{total_sections} sections completed")
+                return result
 
-            results = []
-            batch_size = 15
-            for i in range(0, len(sections_to_generate), batch_size):
-                batch = sections_to_generate[i:i + batch_size]
-                batch_tasks = [process_section_with_semaphore(section) for section in batch]
-                batch_results = await asyncio.gather(*batch_tasks)
-                results.extend(batch_results)
-
-                if i + batch_size < len(sections_to_generate):
-                    await asyncio.sleep(0.2)
-                logger.info(f"Progress: {len(results)}/{total_sections} sections completed")
+            # 一次性提交全部小节任务，仅靠信号量限流：
+            # 某个慢请求不再阻塞整批，空出的并发槽立即被后续任务填上
+            tasks = [asyncio.create_task(process_section_with_semaphore(section))
+                     for section in sections_to_generate]
+            results = await asyncio.gather(*tasks)
 
             organized_results = self._organize_results(results, sections_to_generate)
             success, full_content = await self._save_results_async(organized_results)
@@ -635,7 +720,8 @@ class BiddingWorkflow:
                 content_parts.append(f"# {chapter}\n\n")
                 section_groups = {}
                 for section in sections:
-                    section_number = '.'.join(section['title'].split()[:1][0].split('.')[:2])
+                    m = _SEC_NUM_RE.match(section['title'])
+                    section_number = m.group(1) if m else ''
                     section_title = section['title']
                     section_prefix = section_number + ' '
                     full_section_title = next(
@@ -656,8 +742,9 @@ class BiddingWorkflow:
                         content_parts.append(f"### {subsection['title']}\n\n{subsection['content']}\n\n")
 
             full_content = "\n".join(content_parts)
-            with open(self.document_save_path, 'w', encoding='utf-8') as f:
-                f.write(full_content)
+            # 整篇文档一次性落盘；写入放到线程池，期间事件循环可继续服务其他请求
+            await self._close_content_fp()
+            await asyncio.to_thread(self._write_file_sync, self.document_save_path, full_content)
 
             logger.info(f"Full document saved to {self.document_save_path}, size: {len(full_content)} chars")
             return (True, full_content)
@@ -666,12 +753,16 @@ class BiddingWorkflow:
             return (False, "")
 
     # ========== 核心修复6：优化save_outline_json，添加容错不中断流程 ==========
-    def save_outline_json(self, outline_json: str):
+    def save_outline_json(self, outline_json: Union[str, dict]):
         try:
             OUTLINE_DIR.mkdir(parents=True, exist_ok=True)
             json_file = OUTLINE_DIR / 'outline.json'
-            with open(json_file, 'w', encoding='utf-8') as f:
-                f.write(outline_json)
+            if isinstance(outline_json, str):
+                json_bytes = outline_json.encode('utf-8')
+            else:
+                json_bytes = orjson.dumps(outline_json, option=orjson.OPT_INDENT_2)
+            with open(json_file, 'wb') as f:
+                f.write(json_bytes)
             logger.info(f"Saved outline JSON to {json_file}")
 
             md_content = self._convert_outline_to_markdown(outline_json)
@@ -713,7 +804,7 @@ class BiddingWorkflow:
         try:
             # 1. 解析大纲JSON（确保是字典）
             if isinstance(outline_json, str):
-                outline = json.loads(outline_json)
+                outline = orjson.loads(outline_json)
             else:
                 outline = outline_json
 
@@ -747,6 +838,30 @@ class BiddingWorkflow:
                 outline_json=json.dumps(outline_json, ensure_ascii=False, indent=2))
 
 
+# ======================================================================================
+# 共享 Workflow 单例：避免每个请求重建 LLMClient（HTTP 连接池、TLS 握手）
+# ======================================================================================
+_shared_workflow: Optional[BiddingWorkflow] = None
+
+
+async def get_shared_workflow() -> BiddingWorkflow:
+    """获取全局共享的 BiddingWorkflow 实例（首次调用时初始化）"""
+    global _shared_workflow
+    if _shared_workflow is None:
+        workflow = BiddingWorkflow()
+        await workflow.init_async()
+        _shared_workflow = workflow
+    return _shared_workflow
+
+
+async def close_shared_workflow():
+    """关闭共享实例（服务停止时调用）"""
+    global _shared_workflow
+    if _shared_workflow is not None:
+        await _shared_workflow.__aexit__(None, None, None)
+        _shared_workflow = None
+
+
 def dict_to_outline(data: dict) -> OutlineNode:
     node = OutlineNode(
         title=data['title'],
@@ -765,7 +880,7 @@ def dict_to_outline(data: dict) -> OutlineNode:
 async def get_all_prompts():
     try:
         # 修复：删除 sync_to_async，直接同步调用（轻量操作无需异步）
-        prompts_data = global_prompt_manager.get_all_prompts()
+        prompts_data = get_prompt_manager().get_all_prompts()
         return jsonify({
             "code": 200,
             "msg": "success",
@@ -786,8 +901,6 @@ async def save_prompt():
         request_data = await request.get_json()
         key = request_data.get('key')
         content = request_data.get('content')
-        is_custom = request_data.get('is_custom', False)
-
         if not key or content is None:
             return jsonify({
                 "code": 400,
@@ -795,13 +908,8 @@ async def save_prompt():
                 "data": None
             }), 400
 
-        if is_custom:
-            custom_prompts = global_prompt_manager.user_prompts.get("CUSTOM_PROMPTS", {})
-            custom_prompts[key] = content
-            global_prompt_manager.user_prompts["CUSTOM_PROMPTS"] = custom_prompts
-            global_prompt_manager.save_prompt("CUSTOM_PROMPTS", custom_prompts)
-        else:
-            global_prompt_manager.save_prompt(key, content)
+        # 默认/自定义统一交给 save_prompt：非默认 key 由管理器自动归入 CUSTOM_PROMPTS
+        get_prompt_manager().save_prompt(key, content)
 
         return jsonify({
             "code": 200,
@@ -820,7 +928,7 @@ async def save_prompt():
 @prompt_bp.route('/api/prompts/<string:key>', methods=['DELETE'])
 async def delete_prompt(key):
     try:
-        delete_success = global_prompt_manager.delete_prompt(key)
+        delete_success = get_prompt_manager().delete_prompt(key)
         if not delete_success:
             return jsonify({
                 "code": 400,
@@ -845,7 +953,7 @@ async def delete_prompt(key):
 @prompt_bp.route('/api/prompts/reset/<string:key>', methods=['POST'])
 async def reset_prompt(key):
     try:
-        global_prompt_manager.reset_prompt(key)
+        get_prompt_manager().reset_prompt(key)
         return jsonify({
             "code": 200,
             "msg": "提示词重置为默认值成功",
@@ -866,26 +974,26 @@ async def prompt_manage_page():
 
 
 # ======================================================================================
-# 业务接口（修复：实例化后调用异步初始化）
+# 业务接口（复用共享 Workflow 实例：LLM 连接池和提示词配置随进程存活）
 # ======================================================================================
 @prompt_bp.route('/generate_outline', methods=['POST'])
 async def generate_outline():
-    workflow = BiddingWorkflow()
-    await workflow.init_async()  # 新增：调用异步初始化
+    workflow = await get_shared_workflow()
     try:
         logger.info("Starting outline generation")
-        workflow.load_input_files()
-        outline_json = await workflow.generate_outline()
-        if not outline_json:
-            logger.error("Failed to generate outline")
-            return jsonify({"status": "error", "message": "Failed to generate outline"}), 500
-
-        workflow.outline = workflow.parse_outline_json(outline_json)
-        workflow.save_outline()
-        return jsonify({
-            "status": "success",
-            "outline": workflow.outline.to_dict()
-        })
+        async with workflow.lock:
+            await workflow.load_input_files()
+            outline_json = await workflow.generate_outline()
+            if not outline_json:
+                logger.error("Failed to generate outline")
+                return jsonify({"status": "error", "message": "Failed to generate outline"}), 500
+
+            workflow.outline = workflow.parse_outline_json(outline_json)
+            workflow.save_outline()
+            return jsonify({
+                "status": "success",
+                "outline": workflow.outline.to_dict()
+            })
     except Exception as e:
         logger.error(f"Error in generate_outline: {str(e)}", exc_info=True)
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -893,34 +1001,32 @@ async def generate_outline():
 
 @prompt_bp.route('/generate_content', methods=['POST'])
 async def generate_content():
-    workflow = BiddingWorkflow()
-    await workflow.init_async()
+    workflow = await get_shared_workflow()
     try:
-        success = await workflow.generate_full_content_async()
+        async with workflow.lock:
+            success = await workflow.generate_full_content_async()
         return jsonify({"status": "success" if success else "error"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
-    finally:
-        await workflow.llm_client.close()
 
 
 @prompt_bp.route('/generate_document', methods=['POST'])
 async def generate_document():
-    workflow = BiddingWorkflow()
-    await workflow.init_async()
+    workflow = await get_shared_workflow()
     try:
-        workflow.load_input_files()
-        with open(OUTLINE_DIR / 'outline.json', 'r', encoding='utf-8') as f:
-            outline_dict = json.load(f)
-            workflow.outline = workflow.parse_outline_json(outline_dict)
-
-        success = await workflow.generate_full_content_async()
-        if not success:
-            return jsonify({"status": "error", "message": "Failed to generate content"}), 500
-        # ========== 核心修改：统一返回格式 + 大文本兼容 ==========
-        # 1. 读取本地文件（避免内存中存储超大字符串）
-        with open(workflow.document_save_path, 'r', encoding='utf-8') as f:
-            full_content = f.read()
+        async with workflow.lock:
+            await workflow.load_input_files()
+            with open(OUTLINE_DIR / 'outline.json', 'r', encoding='utf-8') as f:
+                outline_dict = json.load(f)
+                workflow.outline = workflow.parse_outline_json(outline_dict)
+
+            success = await workflow.generate_full_content_async()
+            if not success:
+                return jsonify({"status": "error", "message": "Failed to generate content"}), 500
+            # ========== 核心修改：统一返回格式 + 大文本兼容 ==========
+            # 1. 读取本地文件（避免内存中存储超大字符串）
+            with open(workflow.document_save_path, 'r', encoding='utf-8') as f:
+                full_content = f.read()
 
         return jsonify({
             "success": True,
@@ -21,6 +21,7 @@ class Config:
     
     MAX_RETRIES = 3
     MAX_TOKENS = 8192
+    MAX_HISTORY = 32  # 对话历史保留的最大消息条数（超出后丢弃最旧轮次）
     TEMPERATURE = 0.7
     TOP_P = 0.1
     TIMEOUT = 30
@@ -28,6 +29,10 @@ class Config:
     # 重试配置
     RETRY_DELAY = 2
     RETRY_BACKOFF = 1.5
+
+    # 限流配置（主动令牌桶，避免批量生成时冲破服务商 RPM/TPM 配额）
+    LLM_RPM = 300       # 每分钟最大请求数
+    LLM_TPM = 400000    # 每分钟最大 token 数
     
     # API 配置
     REQUEST_TIMEOUT = 30
@@ -1,22 +1,188 @@
 import os
+import hashlib
+import random
 from config import Config
 import logging
 import json
+import orjson
 from prompts import Prompts
 import time
 import asyncio
 import aiohttp
+from collections import Counter, deque
 from typing import List, Dict, Optional
 import re
 import ssl
-import requests  # 仅保留一次导入
 
 # 初始化日志
 logger = logging.getLogger(__name__)
 
+# 共享 SSL 上下文：create_default_context 每次要从磁盘加载系统信任库（约15ms、数万次
+# 内存分配），在 I/O 热路径上纯属浪费；上下文只读复用对 aiohttp 会话是线程安全的
+_SHARED_SSL_CONTEXT = ssl.create_default_context()
+_SHARED_SSL_CONTEXT.check_hostname = False
+
+# 磁盘响应缓存目录：内容寻址（blake2b 指纹作文件名），跨进程/跨次运行生效，
+# 崩溃重跑或开发迭代时已生成的章节直接读盘，不再消耗配额
+_DISK_CACHE_DIR = Config.BASE_DIR / '.llm_cache'
+
+
+def _disk_cache_get(key: bytes):
+    """读磁盘缓存，未命中或读取失败返回 None（同步函数，调用方用 to_thread 包装）"""
+    try:
+        return (_DISK_CACHE_DIR / key.hex()).read_text(encoding='utf-8')
+    except (FileNotFoundError, OSError):
+        return None
+
+
+def _disk_cache_put(key: bytes, content: str):
+    """写磁盘缓存（同步函数，调用方用 to_thread 包装）；失败只记日志不影响主流程"""
+    try:
+        _DISK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        (_DISK_CACHE_DIR / key.hex()).write_text(content, encoding='utf-8')
+    except OSError as e:
+        logger.warning(f"Failed to write LLM disk cache: {e}")
+
+
+class AsyncRateLimiter:
+    """RPM/TPM 双令牌桶限流器
+
+    纯被动的超时重试挡不住批量生成时的突发流量——并发一高就冲破服务商配额，
+    触发成串的失败重试。发请求前先过这道闸，把实际并发稳定在配额以内。
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.available_requests = float(rpm)
+        self.available_tokens = float(tpm)
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, n_requests: int = 1, n_tokens: int = 0):
+        """阻塞直到桶内配额足够，然后扣除"""
+        # 成本钳制到桶容量：超大请求（如内嵌整份投标文件的粗估 token 数）
+        # 永远攒不满整桶配额，不钳制会在此无限等待并卡死调用方持有的锁
+        n_requests = min(n_requests, self.rpm)
+        n_tokens = min(n_tokens, self.tpm)
+        while True:
+            async with self._lock:
+                now = time.monotonic()
+                elapsed = now - self.last_update
+                self.last_update = now
+                self.available_requests = min(self.rpm, self.available_requests + elapsed * self.rpm / 60)
+                self.available_tokens = min(self.tpm, self.available_tokens + elapsed * self.tpm / 60)
+                if self.available_requests >= n_requests and self.available_tokens >= n_tokens:
+                    self.available_requests -= n_requests
+                    self.available_tokens -= n_tokens
+                    return
+                wait = max(
+                    (n_requests - self.available_requests) * 60 / self.rpm,
+                    (n_tokens - self.available_tokens) * 60 / self.tpm if self.tpm else 0.0,
+                )
+            await asyncio.sleep(max(wait, 0.05))
+
+
+
+# require_json 解析失败时的兜底大纲（确保前端拿到可解析的结构）
+_DEFAULT_OUTLINE = {
+    "body_paragraphs": [
+        {
+            "chapter_title": "项目验收要求",
+            "sections": [
+                {
+                    "section_title": "验收阶段",
+                    "sub_sections": [
+                        {
+                            "sub_section_title": "总体要求",
+                            "content_summary": "项目验收需符合合同及行业规范要求"
+                        }
+                    ]
+                }
+            ]
+        }
+    ]
+}
+
+
+# 预编译代码块围栏正则，避免每个响应重复编译
+_RE_CODE_FENCE = re.compile(r'^```(?:json)?\s*|\s*```\s*$')
+
+# JSON 清理允许保留的标点
+_JSON_PUNCT = frozenset('[]{}:",.')
+
+
+class _SanitizeTable(dict):
+    """str.translate 映射表：非法码点映射为 None（删除），合法码点映射为自身
+
+    惰性按需填充并自缓存，不必为整个 Unicode 平面预建 110 万项的表；
+    translate 在 C 层单遍扫描，替代每响应一次的大字符类正则。
+    """
+
+    def __missing__(self, cp):
+        ch = chr(cp)
+        keep = ('一' <= ch <= '龥'
+                or (ch.isascii() and ch.isalnum())
+                or ch in _JSON_PUNCT
+                or ch.isspace())
+        result = ch if keep else None
+        self[cp] = result
+        return result
+
+
+_SANITIZE_TABLE = _SanitizeTable()
+
+# 换行/回车删除表：translate 单遍完成，替代逐个 replace 的多次全量扫描
+_STRIP_NLCR = str.maketrans('', '', '\n\r')
+
+
+class _Msg:
+    """对话消息：__slots__ 定长对象，比每轮一个 dict 省下哈希表开销（长对话下显著）"""
+    __slots__ = ('role', 'content')
+
+    def __init__(self, role: str, content: str):
+        self.role = role
+        self.content = content
+
+
+def _to_json_ready(msgs) -> List[Dict]:
+    """发送前把 _Msg 序列转成可 JSON 化的 dict 列表"""
+    return [{'role': m.role, 'content': m.content} for m in msgs]
+
+# 批量单次调用的分节定界符（见 generate_sections_batch_singlecall_async）
+_RE_BATCH_DELIM = re.compile(r'<<<第(\d+)节>>>')
+
+
+def _repair_truncated_json(s: str) -> str:
+    """修复被截断的JSON文本：补引号、悬挂键值，再用单次 Counter 扫描配平括号"""
+    # 双字符转义先用 replace 处理，单字符删除合并为一次 translate 扫描
+    s = s.replace('\\"', '"').translate(_STRIP_NLCR)
+    if s.count('"') % 2 != 0:
+        s += '"'
+    if s.endswith(('"', ':', '[', '{')):
+        s += '""'
+    counts = Counter(s)
+    return (s + ']' * max(0, counts['['] - counts[']'])
+            + '}' * max(0, counts['{'] - counts['}']))
+
 
 # 合并两个 LLMClient 类，保留所有有效功能，删除重复定义
 class LLMClient:
+    # 限流器按 api_base 共享（类级）：同一端点的多个客户端实例共用一份配额
+    _rate_limiters: Dict[str, AsyncRateLimiter] = {}
+
+    # 百度 Access Token 类级缓存：有效期约30天，多个实例共享一份而不是各自重取
+    _baidu_token: Optional[str] = None
+    _baidu_token_expiry: float = 0.0
+    _baidu_token_lock = asyncio.Lock()
+
+    @classmethod
+    def _limiter_for(cls, api_base: str) -> AsyncRateLimiter:
+        limiter = cls._rate_limiters.get(api_base)
+        if limiter is None:
+            limiter = cls._rate_limiters[api_base] = AsyncRateLimiter(Config.LLM_RPM, Config.LLM_TPM)
+        return limiter
+
     # 整合两个类的 __init__ 方法，兼容智谱/火山引擎/百度，保留环境变量配置
     def __init__(self, api_key=None, api_secret=None, api_base=None, model=None, temperature=0.7, max_tokens=8192,
                  timeout=300):
@@ -28,23 +194,66 @@ class LLMClient:
         self.temperature = temperature or Config.TEMPERATURE
         self.max_tokens = max_tokens or Config.MAX_TOKENS
         self.timeout = timeout or Config.TIMEOUT
-        # 核心修复：移除 self.session 复用，改为每次调用创建新会话
-        self.messages = []
-        # 百度专属：获取 Access Token（智谱无需此逻辑）
-        self.access_token = self._get_baidu_access_token() if self.api_secret else None
+        # 服务商判定：api_base 在客户端生命周期内不变，启动时扫描一次，
+        # 热路径（每次调用的鉴权头/响应分支）不再重复做字符串包含判断
+        if self.api_secret:
+            self._provider = 'baidu'
+        elif 'bigmodel.cn' in self.api_base:
+            self._provider = 'zhipu'
+        elif 'dashscope.aliyuncs.com' in self.api_base:
+            self._provider = 'dashscope'
+        else:
+            self._provider = 'volcano'
+        self._auth_header = {
+            'zhipu': {"Authorization": f"glm-key {self.api_key}"},
+            'dashscope': {"Authorization": f"Bearer {self.api_key}"},
+            'volcano': {"Authorization": f"Bearer {self.api_key}"},
+            'baidu': {},
+        }[self._provider]
+        # 长连接会话：首次调用时创建，随客户端生命周期复用（客户端本身是应用级单例，
+        # 会话即进程级共享），避免每次请求重新 TCP+TLS 握手
+        self._session = None
+        self._session_lock = asyncio.Lock()  # 防止并发首调时重复建会话
+        # 对话历史：有界 deque，超出 MAX_HISTORY 自动丢弃最旧轮次，
+        # 避免长对话下每次调用都序列化并计费整段历史（system 消息单独保存不被挤出）
+        self.messages = deque(maxlen=Config.MAX_HISTORY or 32)
+        self._system_msg: Optional[_Msg] = None
+        # 响应缓存：确定性调用（temperature=0 或显式要求）同样的输入直接复用结果，
+        # 命中时省掉整个网络往返和 token 消耗
+        self._resp_cache: Dict[bytes, str] = {}
+        # 百度专属：Access Token 改为首次调用时异步获取（构造函数不再发阻塞网络请求）
+        self.access_token = None
         logger.info("LLM client initialized successfully")
         print(f"加载的API Key：{self.api_key[:10]}...")
         print(f"加载的API地址：{self.api_base}")  # 新增：打印API地址，验证配置加载
 
-    # 百度 Access Token 获取方法（保留原有功能，智谱无需调用）
-    def _get_baidu_access_token(self):
-        try:
-            token_url = f"https://aip.baidubce.com/oauth/2.0/token?grant_type=client_credentials&client_id={self.api_key}&client_secret={self.api_secret}"
-            response = requests.get(token_url, timeout=10)
-            response.raise_for_status()
-            return response.json().get("access_token")
-        except Exception as e:
-            raise ValueError(f"获取百度 Access Token 失败：{str(e)}")
+    # 百度 Access Token 获取方法（异步 + TTL 缓存，智谱无需调用）
+    async def _ensure_baidu_token(self) -> str:
+        """获取百度 Access Token：未过期直接复用类级缓存，过期才重新请求"""
+        cls = type(self)
+        if cls._baidu_token and time.time() < cls._baidu_token_expiry:
+            self.access_token = cls._baidu_token
+            return cls._baidu_token
+        async with cls._baidu_token_lock:
+            if cls._baidu_token and time.time() < cls._baidu_token_expiry:
+                self.access_token = cls._baidu_token
+                return cls._baidu_token
+            try:
+                token_url = (
+                    "https://aip.baidubce.com/oauth/2.0/token?grant_type=client_credentials"
+                    f"&client_id={self.api_key}&client_secret={self.api_secret}"
+                )
+                session = await self._ensure_session()
+                async with session.get(token_url, timeout=10) as response:
+                    response.raise_for_status()
+                    result = await response.json()
+                cls._baidu_token = result.get("access_token")
+                # 提前5分钟过期，留出刷新余量
+                cls._baidu_token_expiry = time.time() + result.get("expires_in", 2592000) - 300
+            except Exception as e:
+                raise ValueError(f"获取百度 Access Token 失败：{str(e)}")
+        self.access_token = cls._baidu_token
+        return cls._baidu_token
 
     # 异步上下文管理器入口（适配新的会话管理）
     async def __aenter__(self):
@@ -52,16 +261,11 @@ class LLMClient:
 
     # 异步上下文管理器出口（确保会话关闭）
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        # 无需手动关闭，因为每次调用都用 async with 自动管理
-        pass
+        await self.close()
 
     # 核心修复：删除 _ensure_session 方法，改为每次调用创建新会话
     def _get_session_kwargs(self):
         """构建会话参数（抽离为独立方法，便于复用）"""
-        # 配置 SSL 上下文
-        ssl_context = ssl.create_default_context()
-        ssl_context.check_hostname = False
-
         # 配置连接超时
         timeout = aiohttp.ClientTimeout(
             total=self.timeout,
@@ -69,12 +273,14 @@ class LLMClient:
             sock_read=20
         )
 
-        # 配置连接器
+        # 配置连接器：开启 keep-alive 复用（aiohttp 不支持 HTTP/2 多路复用，
+        # 以连接池热连接复用达到同等效果——并发请求复用已握手的 TLS 连接）
         connector_kwargs = {
-            'ssl': ssl_context,
-            'limit': 15,  # 调整并发连接数
-            'force_close': True,
-            'enable_cleanup_closed': True
+            'ssl': _SHARED_SSL_CONTEXT,
+            'limit': 32,               # 连接池总上限
+            'limit_per_host': 16,      # 单服务商上限（全部请求都打向同一 host）
+            'keepalive_timeout': 75,   # 空闲连接保活时长，批次间隔内不掉热连接
+            'ttl_dns_cache': 300,      # DNS 结果缓存，避免每次建连都解析
         }
 
         connector = aiohttp.TCPConnector(**connector_kwargs)
@@ -88,180 +294,287 @@ class LLMClient:
             'connector': connector
         }
 
-        # 添加鉴权头（区分智谱/火山引擎/百度）
-        if not self.api_secret:
-            # 智谱AI：glm-key 前缀；火山引擎：Bearer 前缀
-            # 自动识别：根据API_BASE是否包含bigmodel.cn判断是否为智谱
-            # 通义千问认证格式：Bearer {API_KEY}（和OpenAI一致）
-            if "dashscope.aliyuncs.com" in self.api_base:
-                session_kwargs['headers']["Authorization"] = f"Bearer {self.api_key}"
-            elif "bigmodel.cn" in self.api_base:
-                session_kwargs['headers']["Authorization"] = f"glm-key {self.api_key}"
-            else:
-                session_kwargs['headers']["Authorization"] = f"Bearer {self.api_key}"
+        # 添加鉴权头（__init__ 时已按服务商判定好，这里直接合入）
+        session_kwargs['headers'].update(self._auth_header)
         # 如果使用代理，添加代理配置（智谱无需代理，建议关闭）
-        if Config.USE_PROXY and "bigmodel.cn" not in self.api_base:
+        if Config.USE_PROXY and self._provider != 'zhipu':
             session_kwargs['proxy'] = Config.PROXY_URLS['https']
             logger.info(f"Using proxy: {Config.PROXY_URLS}")
 
         return session_kwargs
 
-    # 核心方法：_call_llm_async（使用 async with 管理会话，解决资源泄漏+移除硬编码URL）
-    async def _call_llm_async(self, messages, require_json=False, require_outline=False):
+    async def _ensure_session(self) -> aiohttp.ClientSession:
+        """获取长连接会话，不存在或已关闭时重建（加锁避免并发重复创建）"""
+        if self._session is None or self._session.closed:
+            async with self._session_lock:
+                if self._session is None or self._session.closed:
+                    self._session = aiohttp.ClientSession(**self._get_session_kwargs())
+        return self._session
+
+    def _cache_key(self, messages) -> bytes:
+        """缓存键：采样参数 + 完整消息列表的指纹"""
+        return hashlib.blake2b(
+            orjson.dumps((self.model, self.temperature, self.max_tokens, Config.TOP_P, messages)),
+            digest_size=16,
+        ).digest()
+
+    # 核心方法：_call_llm_async（复用长连接会话，移除硬编码URL）
+    @staticmethod
+    def _backoff(prev_wait: float) -> float:
+        """去相关抖动退避：并发批量重试时各任务等待时间互相错开，避免齐步重试风暴"""
+        return min(60.0, random.uniform(Config.RETRY_DELAY, prev_wait * 3))
+
+    async def _call_llm_async(self, messages, require_json=False, require_outline=False, use_cache=None):
         retry_count = 0
-        session_kwargs = self._get_session_kwargs()
+        wait_time = float(Config.RETRY_DELAY)
+
+        # use_cache=None 表示自动：仅确定性采样（temperature=0）时启用缓存
+        cache_key = None
+        if use_cache or (use_cache is None and self.temperature == 0):
+            cache_key = self._cache_key(messages)
+            cached = self._resp_cache.get(cache_key)
+            if cached is not None:
+                logger.debug("LLM response cache hit")
+                return cached
+            # 内存未命中再查磁盘缓存（跨进程复用），命中则回填内存
+            cached = await asyncio.to_thread(_disk_cache_get, cache_key)
+            if cached is not None:
+                logger.debug("LLM disk cache hit")
+                self._resp_cache[cache_key] = cached
+                return cached
 
         while retry_count <= Config.MAX_RETRIES:
-            # 核心修复：使用 async with 自动创建/关闭会话
-            async with aiohttp.ClientSession(**session_kwargs) as session:
-                try:
-                    request_params = {
-                        "model": self.model,
-                        "messages": messages,
-                        "temperature": self.temperature,
-                        "max_tokens": self.max_tokens,
-                        "top_p": Config.TOP_P,
-                        "stream": False
-                    }
-
-                    logger.debug(f"Sending request with params: {json.dumps(request_params, ensure_ascii=False)}")
-
-                    # 核心修复：移除硬编码的火山方舟URL，改用配置的self.api_base
-                    if not self.api_secret:
-                        # 智谱/火山引擎：使用配置的API_BASE（不再硬编码）
-                        full_valid_url = self.api_base  # 直接使用配置的地址
-                        async with session.post(
-                                full_valid_url,  # 配置的智谱地址：https://open.bigmodel.cn/api/paas/v4/chat/completions
-                                json=request_params,
-                                timeout=self.timeout
-                        ) as response:
-                            content = await self._handle_response(response, require_json)
-                            return content
-                    else:
-                        # 百度：直接使用完整路径 + Access Token
-                        full_valid_url = f"{self.api_base}?access_token={self.access_token}"
-                        async with session.post(
-                                full_valid_url,
-                                json=request_params,
-                                timeout=self.timeout
-                        ) as response:
-                            content = await self._handle_response(response, require_json)
-                            return content
-
-                except asyncio.TimeoutError:
-                    retry_count += 1
-                    if retry_count <= Config.MAX_RETRIES:
-                        wait_time = Config.RETRY_DELAY * (Config.RETRY_BACKOFF ** (retry_count - 1))
-                        logger.warning(
-                            f"Request timeout. Retrying in {wait_time} seconds... (Attempt {retry_count}/{Config.MAX_RETRIES})")
-                        await asyncio.sleep(wait_time)
-                    else:
-                        logger.error("Request failed after maximum retries due to timeout")
-                        raise ValueError("Request timeout after max retries")
-                except Exception as e:
-                    logger.error(f"Request failed: {str(e)}")
-                    raise e
+            # 复用客户端级会话：连接池/keep-alive 跨请求生效
+            session = await self._ensure_session()
+            try:
+                request_params = {
+                    "model": self.model,
+                    "messages": messages,
+                    "temperature": self.temperature,
+                    "max_tokens": self.max_tokens,
+                    "top_p": Config.TOP_P,
+                    "stream": False
+                }
+
+                # DEBUG 关闭时跳过整个 messages 数组的序列化（通常是本次调用里最大的对象）
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Sending request with params: %s", json.dumps(request_params, ensure_ascii=False))
+
+                # 主动限流：粗估 token 成本（约4字符/token），配额不足时在此等待而不是打出去吃429
+                est_tokens = len(json.dumps(messages, ensure_ascii=False)) // 4
+                await self._limiter_for(self.api_base).acquire(1, est_tokens)
+
+                # 请求体用 orjson 预序列化成 bytes（data= 直发），
+                # 避开 aiohttp json= 路径里标准库 dumps + encode 的中间分配
+                body = orjson.dumps(request_params)
+
+                # 核心修复：移除硬编码的火山方舟URL，改用配置的self.api_base
+                if self._provider != 'baidu':
+                    # 智谱/火山引擎：使用配置的API_BASE（不再硬编码）
+                    full_valid_url = self.api_base  # 直接使用配置的地址
+                    async with session.post(
+                            full_valid_url,  # 配置的智谱地址：https://open.bigmodel.cn/api/paas/v4/chat/completions
+                            data=body,
+                            timeout=self.timeout
+                    ) as response:
+                        content = await self._handle_response(response, require_json)
+                        if cache_key is not None and content:
+                            self._resp_cache[cache_key] = content
+                            await asyncio.to_thread(_disk_cache_put, cache_key, content)
+                        return content
+                else:
+                    # 百度：直接使用完整路径 + Access Token（惰性获取并缓存）
+                    full_valid_url = f"{self.api_base}?access_token={await self._ensure_baidu_token()}"
+                    async with session.post(
+                            full_valid_url,
+                            data=body,
+                            timeout=self.timeout
+                    ) as response:
+                        content = await self._handle_response(response, require_json)
+                        if cache_key is not None and content:
+                            self._resp_cache[cache_key] = content
+                            await asyncio.to_thread(_disk_cache_put, cache_key, content)
+                        return content
+
+            except asyncio.TimeoutError:
+                retry_count += 1
+                if retry_count <= Config.MAX_RETRIES:
+                    wait_time = self._backoff(wait_time)
+                    logger.warning(
+                        f"Request timeout. Retrying in {wait_time:.1f} seconds... (Attempt {retry_count}/{Config.MAX_RETRIES})")
+                    await asyncio.sleep(wait_time)
+                else:
+                    logger.error("Request failed after maximum retries due to timeout")
+                    raise ValueError("Request timeout after max retries")
+            except aiohttp.ClientResponseError as e:
+                # 429/5xx：可重试；优先遵循服务端 Retry-After，否则走抖动退避
+                retry_count += 1
+                if retry_count > Config.MAX_RETRIES:
+                    logger.error(f"Request failed after maximum retries (status {e.status})")
+                    raise ValueError(f"API returned status {e.status} after max retries")
+                retry_after = (e.headers or {}).get('Retry-After')
+                if retry_after and str(retry_after).isdigit():
+                    wait_time = min(60.0, float(retry_after))
+                else:
+                    wait_time = self._backoff(wait_time)
+                logger.warning(
+                    f"Retryable status {e.status}. Retrying in {wait_time:.1f} seconds... (Attempt {retry_count}/{Config.MAX_RETRIES})")
+                await asyncio.sleep(wait_time)
+            except Exception as e:
+                logger.error(f"Request failed: {str(e)}")
+                raise e
 
     # 响应处理辅助方法（强化 JSON 清理，适配 LLM 异常返回）
     async def _handle_response(self, response, require_json):
-        # 记录原始响应
-        response_text = await response.text()
-        logger.debug(f"Raw API response: {response_text[:500]}...")  # 截断长日志
+        # 读取原始字节：orjson 直接解析 bytes，省掉整段响应先解码成 str 的中间分配
+        raw = await response.read()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Raw API response: %s...", raw[:500].decode('utf-8', errors='replace'))  # 截断长日志
 
-        # 状态码校验
+        # 状态码校验：429/5xx 抛 ClientResponseError（带 Retry-After 头）交给重试循环
         if response.status != 200:
-            logger.error(f"API returned status {response.status}: {response_text[:500]}...")
+            excerpt = raw[:500].decode('utf-8', errors='replace')
+            logger.error(f"API returned status {response.status}: {excerpt}...")
+            if response.status == 429 or response.status >= 500:
+                raise aiohttp.ClientResponseError(
+                    response.request_info, response.history,
+                    status=response.status, message=excerpt[:200], headers=response.headers)
             raise ValueError(f"API returned status {response.status}")
 
         # 解析响应
         try:
-            result = json.loads(response_text)
+            result = orjson.loads(raw)
         except json.JSONDecodeError:
-            logger.error(f"Failed to parse API response as JSON: {response_text[:500]}...")
+            logger.error(f"Failed to parse API response as JSON: {raw[:500].decode('utf-8', errors='replace')}...")
             raise ValueError("Invalid JSON in API response")
 
         # 提取内容（区分智谱/火山引擎/百度，智谱和火山引擎响应格式一致）
-        if not self.api_secret:
+        if self._provider != 'baidu':
             # 智谱/火山引擎响应（格式完全兼容）
             if "choices" in result and result["choices"] and "message" in result["choices"][0]:
                 content = result["choices"][0]["message"]["content"].strip()
             else:
-                logger.error(f"Unexpected response structure: {json.dumps(result, ensure_ascii=False)[:500]}...")
+                logger.error(f"Unexpected response structure: {orjson.dumps(result).decode()[:500]}...")
                 raise ValueError("Invalid response structure (Zhipu/Volcano Engine)")
         else:
             # 百度响应
             if "result" in result:
                 content = result["result"].strip()
             else:
-                logger.error(f"Unexpected response structure (Baidu): {json.dumps(result, ensure_ascii=False)[:500]}...")
+                logger.error(f"Unexpected response structure (Baidu): {orjson.dumps(result).decode()[:500]}...")
                 raise ValueError("Invalid response structure (Baidu)")
 
-        # 强化 JSON 格式校验和清理（适配 LLM 错误转义/残缺）
-        # 找到require_json=True的修复逻辑，替换为以下强化版：
+        # JSON 响应：先走快路径直接解析，失败才进入修复管线
         if require_json:
+            cleaned = _RE_CODE_FENCE.sub('', content.strip())
             try:
-                # 1. 清理代码块和无效字符
-                content = re.sub(r'^```(?:json)?\s*|\s*```\s*$', '', content.strip())  # 清理代码块
-                content = re.sub(r'[^\u4e00-\u9fa5a-zA-Z0-9\[\]{}:"",.\s]', '', content)  # 仅保留中文/英文/JSON字符
-                content = content.replace('\\"', '"').replace('\n', '').replace('\r', '')  # 修复转义
-
-                # 2. 智能补全截断的JSON（核心：从后往前补全，解决"sub_sect]"这类截断）
-                # 示例：把"sub_sect]"补全为"sub_section_title": ""}]}}
-                # 第一步：补全引号
-                quote_count = content.count('"')
-                if quote_count % 2 != 0:
-                    content += '"' * (2 - quote_count % 2)
-                # 第二步：补全未闭合的键值对（针对截断的字段名）
-                if content.endswith('"') or content.endswith(':') or content.endswith('[') or content.endswith('{'):
-                    content += '""'
-                # 第三步：补全括号（从后往前匹配）
-                brace_stack = []
-                bracket_stack = []
-                for char in content:
-                    if char == '{':
-                        brace_stack.append(char)
-                    elif char == '}':
-                        if brace_stack:
-                            brace_stack.pop()
-                    elif char == '[':
-                        bracket_stack.append(char)
-                    elif char == ']':
-                        if bracket_stack:
-                            bracket_stack.pop()
-                # 补全剩余的括号
-                content += ']' * len(bracket_stack) + '}' * len(brace_stack)
-
-                # 3. 验证并格式化
-                json_obj = json.loads(content)
-                content = json.dumps(json_obj, ensure_ascii=False, indent=2)
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON补全失败：{e}，使用默认大纲兜底")
-                # 兜底：返回完整的默认大纲JSON，确保前端能解析
-                default_outline = {
-                    "body_paragraphs": [
-                        {
-                            "chapter_title": "项目验收要求",
-                            "sections": [
-                                {
-                                    "section_title": "验收阶段",
-                                    "sub_sections": [
-                                        {
-                                            "sub_section_title": "总体要求",
-                                            "content_summary": "项目验收需符合合同及行业规范要求"
-                                        }
-                                    ]
-                                }
-                            ]
-                        }
-                    ]
-                }
-                content = json.dumps(default_outline, ensure_ascii=False, indent=2)
-                logger.warning("使用默认大纲JSON兜底")
+                # 快路径：绝大多数响应本就是合法JSON，一次C层解析即返回
+                json_obj = json.loads(cleaned)
+            except json.JSONDecodeError:
+                # 修复路径：清掉非JSON字符（translate 单遍扫描），补全截断，再解析一次
+                cleaned = cleaned.translate(_SANITIZE_TABLE)
+                cleaned = _repair_truncated_json(cleaned)
+                try:
+                    json_obj = json.loads(cleaned)
+                except json.JSONDecodeError as e:
+                    logger.error(f"JSON补全失败：{e}，使用默认大纲兜底")
+                    json_obj = _DEFAULT_OUTLINE
+            content = orjson.dumps(json_obj, option=orjson.OPT_INDENT_2).decode()
 
-                raise ValueError(f"Invalid JSON after cleanup: {str(e)}")
+        return content  # 确保返回处理后的内容
 
+    # 流式调用：stream=True，token 就绪即产出，首 token 延迟取代全文生成时长
+    async def _call_llm_stream_async(self, messages):
+        """异步流式生成：逐块产出增量文本（SSE data: 帧）
 
-        return content  # 确保返回处理后的内容
+        与 _call_llm_async 的区别：不缓存、不做 JSON 修复，调用方自行拼接。
+        """
+        session = await self._ensure_session()
+        request_params = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": Config.TOP_P,
+            "stream": True
+        }
+        est_tokens = len(json.dumps(messages, ensure_ascii=False)) // 4
+        await self._limiter_for(self.api_base).acquire(1, est_tokens)
+
+        if self._provider != 'baidu':
+            full_valid_url = self.api_base
+        else:
+            full_valid_url = f"{self.api_base}?access_token={await self._ensure_baidu_token()}"
+
+        async with session.post(full_valid_url, data=orjson.dumps(request_params), timeout=self.timeout) as response:
+            if response.status != 200:
+                raw = await response.read()
+                logger.error(f"API returned status {response.status}: {raw[:500].decode('utf-8', errors='replace')}...")
+                raise ValueError(f"API returned status {response.status}")
+            async for line in response.content:
+                # SSE 帧格式：data: {...}\n；[DONE] 标记结束
+                if not line.startswith(b'data: '):
+                    continue
+                payload = line[6:].strip()
+                if not payload or payload == b'[DONE]':
+                    continue
+                try:
+                    chunk = orjson.loads(payload)
+                except json.JSONDecodeError:
+                    continue  # 跳过不完整帧
+                if self._provider != 'baidu':
+                    delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+                else:
+                    delta = chunk.get("result")
+                if delta:
+                    yield delta
+
+    async def generate_section_content_stream_async(self, section: Dict, output_path=None) -> Dict:
+        """流式生成单个章节内容：边收边落盘，返回值同 generate_section_content_async"""
+        try:
+            logger.info(f"=== Streaming content for section: {section['title']} ===")
+            start_time = time.time()
+
+            prompt = Prompts.CONTENT_SECTION_USER.format(
+                title=section['title'],
+                content_summary=section['content_summary']
+            )
+            messages = [
+                {"role": "system", "content": Prompts.CONTENT_SYSTEM_ROLE},
+                {"role": "user", "content": prompt}
+            ]
+
+            parts = []
+            # 文件打开/写入/关闭全部经 to_thread 下放线程池，磁盘 I/O 不阻塞事件循环
+            fp = await asyncio.to_thread(open, output_path, 'a', encoding='utf-8') if output_path else None
+            try:
+                async for delta in self._call_llm_stream_async(messages):
+                    parts.append(delta)
+                    if fp is not None:
+                        # 增量落盘：进程中断也保留已生成部分
+                        await asyncio.to_thread(fp.write, delta)
+            finally:
+                if fp is not None:
+                    await asyncio.to_thread(fp.close)
+
+            content = ''.join(parts)
+            elapsed_time = time.time() - start_time
+            if content:
+                logger.info(
+                    f"✓ Successfully streamed {len(content)} chars for {section['title']} in {elapsed_time:.2f}s")
+            else:
+                logger.error(f"✗ Failed to stream content for {section['title']} after {elapsed_time:.2f}s")
+
+            return {
+                'title': section['title'],
+                'content': content if content else "生成失败，请手动补充。"
+            }
+        except Exception as e:
+            logger.error(f"✗ Error streaming content for {section['title']}: {str(e)}")
+            return {
+                'title': section['title'],
+                'content': f"生成失败：{str(e)}"
+            }
 
     # 生成单个章节内容（保留原有功能）
     async def generate_section_content_async(self, section: Dict) -> Dict:
@@ -301,6 +614,75 @@ class LLMClient:
                 'content': f"生成失败：{str(e)}"
             }
 
+    # 批量生成章节内容：信号量限流 + gather 扇出，总耗时从各节延迟之和降为按并发分摊
+    async def generate_sections_batch_async(self, sections: List[Dict], max_concurrency: int = 8) -> List[Dict]:
+        """并发生成多个章节内容
+
+        :param sections: 章节列表（元素同 generate_section_content_async 的入参）
+        :param max_concurrency: 最大并发请求数（受连接池 limit 双重保护）
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def _one(section: Dict) -> Dict:
+            async with sem:
+                return await self.generate_section_content_async(section)
+
+        return await asyncio.gather(*(_one(s) for s in sections), return_exceptions=True)
+
+    # 单次请求生成多个章节：N 个小节合并为一次 POST，只占一个 RPM 配额，
+    # 省掉逐请求的 TLS/排队开销（与 gather 扇出正交，适用于受 RPM 限制的服务商）
+    async def generate_sections_batch_singlecall_async(self, sections: List[Dict], chunk: int = 8) -> List[Dict]:
+        """将多个章节打包进单次请求生成（按 chunk 分组）
+
+        :param sections: 章节列表（元素同 generate_section_content_async 的入参）
+        :param chunk: 每次请求打包的章节数
+        解析失败的分组自动回退到逐节生成，保证结果完整
+        """
+        results: List[Dict] = []
+        for start in range(0, len(sections), chunk):
+            group = sections[start:start + chunk]
+            parsed = await self._generate_group_singlecall(group)
+            if parsed is None:
+                # 回退：该组退化为逐节并发生成
+                logger.warning(f"Batched response unparseable, falling back to per-section calls for {len(group)} sections")
+                parsed = await self.generate_sections_batch_async(group)
+            results.extend(parsed)
+        return results
+
+    async def _generate_group_singlecall(self, group: List[Dict]) -> Optional[List[Dict]]:
+        """一组章节合并为单次调用；输出无法按分隔符对齐时返回 None"""
+        stubs = "\n\n".join(
+            f"[第{i + 1}节] 标题：{s['title']}\n要点：{s.get('content_summary', '')}"
+            for i, s in enumerate(group)
+        )
+        prompt = (
+            f"请依次为下列 {len(group)} 个章节撰写正文。"
+            f"每个章节的输出必须以单独一行「<<<第N节>>>」开头（N 为章节序号），"
+            f"除此之外不要输出任何额外说明。\n\n{stubs}"
+        )
+        try:
+            content = await self._call_llm_async([
+                {"role": "system", "content": Prompts.CONTENT_SYSTEM_ROLE},
+                {"role": "user", "content": prompt}
+            ])
+        except Exception as e:
+            logger.error(f"✗ Batched generation failed: {str(e)}")
+            return None
+        if not content:
+            return None
+
+        parts = _RE_BATCH_DELIM.split(content)
+        # split 结果形如 [前导, 序号1, 正文1, 序号2, 正文2, ...]
+        bodies = {}
+        for i in range(1, len(parts) - 1, 2):
+            bodies[int(parts[i])] = parts[i + 1].strip()
+        if len(bodies) != len(group):
+            return None
+        return [
+            {'title': s['title'], 'content': bodies.get(i + 1) or "生成失败，请手动补充。"}
+            for i, s in enumerate(group)
+        ]
+
     # 初始化内容生成（保留原有功能）
     async def generate_content_init_async(self, tech_content: str, score_content: str, outline: str) -> bool:
         """初始化内容生成的背景信息"""
@@ -317,20 +699,23 @@ class LLMClient:
             logger.error(f"Error initializing content generation: {e}")
             return False
 
-    # 关闭会话（适配新的会话管理，空实现）
+    # 关闭会话（释放长连接会话及其连接池）
     async def close(self):
-        """关闭会话（现在由 async with 自动管理，此方法保留以兼容原有代码）"""
-        pass
+        """关闭长连接会话（客户端生命周期结束时调用）"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
     # 开始新对话（保留原有功能）
     def start_new_chat(self, system_role: str):
         """开始新的对话"""
-        self.messages = [{"role": "system", "content": system_role}]
+        self._system_msg = _Msg("system", system_role)
+        self.messages = deque(maxlen=Config.MAX_HISTORY or 32)
 
     # 添加消息到对话历史（保留原有功能）
     def add_message(self, role: str, content: str):
         """添加消息到对话历史"""
-        self.messages.append({"role": role, "content": content})
+        self.messages.append(_Msg(role, content))
 
     # 异步生成文本（保留原有功能，修复方法调用）
     async def generate_text_async(self, prompt=None, system_role=None, messages=None, require_json=False,
@@ -359,19 +744,13 @@ class LLMClient:
         """异步在现有对话中生成文本（用于内容生成）"""
         try:
             self.add_message("user", prompt)
-            response = await self._call_llm_async(self.messages, require_json=False)
+            # 发送时才拼成 list：system 消息置顶 + 有界历史（_Msg → dict 仅在此处发生）
+            history = _to_json_ready(
+                ([self._system_msg] if self._system_msg else []) + list(self.messages))
+            response = await self._call_llm_async(history, require_json=False)
             if response:
                 self.add_message("assistant", response)
             return response
         except Exception as e:
             logger.error(f"Error in generate_chat_text: {e}", exc_info=True)
             return None
-
-
-# 调试代码（适配合并后的类，可选删除）
-if __name__ == "__main__":
-    # 实例化 LLMClient（参数可选，可省略使用 Config 配置）
-    client = LLMClient(api_key="test", api_base="test", model="test")
-    # 打印包含 call_llm 的属性，验证方法存在
-    attrs = [attr for attr in dir(client) if "call_llm" in attr]
-    print("包含 call_llm 的属性：", attrs)
\ No newline at end of file
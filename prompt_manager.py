@@ -1,20 +1,58 @@
 # prompt_manager.py
+import atexit
+import copy
 import json
+from collections import OrderedDict
+import os
+import threading
+import time
 from pathlib import Path
+from types import MappingProxyType
+
+try:
+    import orjson  # C 实现的编解码，中文长文本下快数倍；缺失时回退标准库
+except ImportError:
+    orjson = None
 from prompts import Prompts  # 导入原始默认提示词（用于重置）
 
+# 模块级配置缓存：config_path -> (st_mtime_ns, 解析后的dict)
+# 同一进程内重复构造 PromptManager 时按 mtime 复用，文件没变就不再读盘+解析
+_CACHE = {}
+
+# 自定义提示词上限：超出后按 LRU 淘汰最久未写入的条目，防止长期进程里配置无界膨胀
+MAX_CUSTOM_PROMPTS = 512
+
 class PromptManager:
+    # 固定槽位：省掉每实例 __dict__，属性访问也更快（全部属性均在 __init__ 赋值）
+    __slots__ = (
+        "config_path", "default_prompts", "_default_keys", "user_prompts",
+        "_prompt_cache", "_all_cache", "_dirty", "_flush_timer",
+        "_write_lock", "journal_path",
+    )
+
     def __init__(self, config_path: Path):
         self.config_path = config_path
         self.default_prompts = self._get_default_prompts()  # 原始默认值
+        self._default_keys = frozenset(self.default_prompts)  # 热路径 in 判定用
         self.user_prompts = self._load_user_prompts()      # 用户修改后的值
+        self._prompt_cache = {}  # get_prompt 结果缓存（热路径上每节内容生成都会查询）
+        self._all_cache = None   # get_all_prompts 组装结果缓存（UI 每次刷新都会调用）
+        # 延迟写盘：连续保存只落盘一次（0.5s 防抖），进程退出时兜底 flush
+        self._dirty = False
+        self._flush_timer = None
+        self._write_lock = threading.Lock()
+        # 增量日志：每次修改只追加一条 O(delta) 记录，崩溃时防抖窗口内的修改不丢；
+        # flush 全量落盘后日志被清空（压实）
+        self.journal_path = self.config_path.with_suffix('.journal')
+        self._replay_journal()
+        atexit.register(self.flush)
 
-    def _get_default_prompts(self) -> dict:
-        """从prompts.py提取所有默认提示词"""
-        return {
-            key: value for key, value in Prompts.__dict__.items()
+    def _get_default_prompts(self):
+        """从prompts.py提取所有默认提示词（只读视图，防止被调用方意外修改）"""
+        return MappingProxyType({
+            key: value for key, value in vars(Prompts).items()
             if not key.startswith("__") and isinstance(value, str)
-        }
+        })
 
     def _load_user_prompts(self) -> dict:
         """加载用户配置（首次运行/文件损坏时自动初始化配置文件）"""
@@ -22,72 +60,238 @@ class PromptManager:
             if not self.config_path.exists():
                 # 初始化配置文件（写入默认值）
                 self._init_default_config()
-                return self.default_prompts
+                return self._fresh_defaults()
+            # 命中缓存：mtime 未变直接复用解析结果（深拷贝避免实例间共享可变状态）
+            mtime = self.config_path.stat().st_mtime_ns
+            cached = _CACHE.get(self.config_path)
+            if cached is not None and cached[0] == mtime:
+                return copy.deepcopy(cached[1])
             # 加载已有配置
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                # 尝试解析JSON
-                user_prompts = json.load(f)
-                # 校验配置完整性（补充缺失的默认字段）
-                for key, value in self.default_prompts.items():
-                    if key not in user_prompts:
-                        user_prompts[key] = value
-                # 确保CUSTOM_PROMPTS字段存在
-                if "CUSTOM_PROMPTS" not in user_prompts:
-                    user_prompts["CUSTOM_PROMPTS"] = {}
+            with open(self.config_path, "rb") as f:
+                # 尝试解析JSON（orjson 直接吃 bytes，省一次解码）
+                raw = f.read()
+                user_prompts = orjson.loads(raw) if orjson is not None else json.loads(raw)
+                # 校验配置完整性：一次 C 层字典合并补齐缺失默认字段（用户值在后，优先生效）
+                user_prompts = {**self.default_prompts, **user_prompts}
+                # 确保CUSTOM_PROMPTS字段存在（OrderedDict 以便按写入顺序做 LRU 淘汰）
+                user_prompts["CUSTOM_PROMPTS"] = OrderedDict(
+                    user_prompts.get("CUSTOM_PROMPTS", {}))
+                _CACHE[self.config_path] = (mtime, copy.deepcopy(user_prompts))
                 return user_prompts
-        except (json.JSONDecodeError, Exception) as e:
-            # 解析失败/其他异常：打印错误信息，重新初始化配置文件
+        except (OSError, json.JSONDecodeError) as e:
+            # 解析失败/读取失败：留档损坏文件后重建默认配置（便于人工恢复用户自定义内容）
             print(f"提示词配置文件损坏或格式错误：{e}，将自动重建默认配置")
+            try:
+                if self.config_path.exists():
+                    bad = self.config_path.with_suffix(f'.bad.{int(time.time())}')
+                    self.config_path.rename(bad)
+                    print(f"原配置已备份至：{bad}")
+            except OSError:
+                pass  # 备份失败不阻塞重建
             self._init_default_config()
-            return self.default_prompts
+            return self._fresh_defaults()
+
+    def _fresh_defaults(self) -> dict:
+        """默认配置的可变副本（含 CUSTOM_PROMPTS），作为初始 user_prompts"""
+        data = dict(self.default_prompts)
+        data.setdefault("CUSTOM_PROMPTS", OrderedDict())
+        return data
 
     def _init_default_config(self):
         """初始化默认配置文件"""
         # 确保config目录存在
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
-        # 写入默认配置
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.default_prompts, f, ensure_ascii=False, indent=2)
-        # 补充CUSTOM_PROMPTS字段（若不存在）
-        if "CUSTOM_PROMPTS" not in self.default_prompts:
-            user_prompts = self.default_prompts.copy()
-            user_prompts["CUSTOM_PROMPTS"] = {}
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(user_prompts, f, ensure_ascii=False, indent=2)
-
-    def save_prompt(self, key: str, content: str) -> None:
-        """保存单个提示词（支持新增/修改）"""
-        self.user_prompts[key] = content
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.user_prompts, f, ensure_ascii=False, indent=2)
+        # 内存中拼好完整配置（含 CUSTOM_PROMPTS），只写一次盘
+        data = dict(self.default_prompts)
+        data.setdefault("CUSTOM_PROMPTS", {})
+        self._atomic_write(data)
+
+    def _atomic_write(self, data: dict):
+        """原子写配置：整段 payload 一次 os.write + fsync 后 os.replace，
+        绕开缓冲文本层的多次小写，崩溃也不会留下半截 JSON"""
+        tmp = self.config_path.with_suffix('.json.tmp')
+        # 紧凑格式：配置由 UI 驱动读写，不为人工阅读付缩进空白的体积
+        payload = (orjson.dumps(data) if orjson is not None
+                   else json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode('utf-8'))
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, payload)
+            os.fsync(fd)  # 先刷盘再替换，替换后的文件内容必然完整
+        finally:
+            os.close(fd)
+        os.replace(tmp, self.config_path)
+
+    def _journal_append(self, record: dict):
+        """追加一条修改日志（单次 write），日志过大时立即压实"""
+        payload = (orjson.dumps(record) if orjson is not None
+                   else json.dumps(record, ensure_ascii=False).encode('utf-8'))
+        try:
+            with open(self.journal_path, "ab") as f:
+                f.write(payload + b"\n")
+            if self.journal_path.stat().st_size > 64 * 1024:
+                self.flush()
+        except OSError:
+            pass  # 日志仅是额外保险，失败不影响防抖全量写
+
+    def _replay_journal(self):
+        """启动时回放日志：恢复上次进程未来得及压实的修改，然后立即压实"""
+        if not self.journal_path.exists():
+            return
+        try:
+            raw = self.journal_path.read_bytes()
+        except OSError:
+            return
+        applied = False
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = orjson.loads(line) if orjson is not None else json.loads(line)
+            except (json.JSONDecodeError, ValueError):
+                continue  # 半截记录（崩溃时最后一行）直接跳过
+            op = record.get("op")
+            if op == "set":
+                if record["k"] == "CUSTOM_PROMPTS":
+                    self.user_prompts["CUSTOM_PROMPTS"] = self._capped_customs(record["v"])
+                else:
+                    self.user_prompts[record["k"]] = record["v"]
+                applied = True
+            elif op == "setc":
+                self._set_custom(record["k"], record["v"])
+                applied = True
+            elif op == "delc":
+                self.user_prompts.get("CUSTOM_PROMPTS", {}).pop(record["k"], None)
+                applied = True
+        if applied:
+            self._dirty = True
+        self.flush()  # 回放完成即压实：全量落盘并清空日志
+
+    def _schedule_flush(self):
+        """标脏并启动防抖定时器：一轮连续修改合并为一次全量写盘"""
+        self._dirty = True
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+        self._flush_timer = threading.Timer(0.5, self.flush)
+        self._flush_timer.daemon = True
+        self._flush_timer.start()
+
+    def flush(self):
+        """立即把未落盘的修改写入配置文件（幂等，atexit 兜底调用）"""
+        with self._write_lock:
+            if not self._dirty:
+                return
+            self._atomic_write(self.user_prompts)
+            self._dirty = False
+            self._update_cache()
+            # 全量已落盘，日志可以清空
+            try:
+                self.journal_path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                pass
+
+    def _update_cache(self):
+        """写盘后刷新模块级缓存（记录新 mtime，避免下次构造重新解析）"""
+        try:
+            _CACHE[self.config_path] = (
+                self.config_path.stat().st_mtime_ns, copy.deepcopy(self.user_prompts))
+        except OSError:
+            _CACHE.pop(self.config_path, None)
+
+    def _set_custom(self, key: str, content: str):
+        """写入自定义提示词并维护 LRU 序，超上限时淘汰最旧条目"""
+        customs = self.user_prompts.setdefault("CUSTOM_PROMPTS", OrderedDict())
+        customs[key] = content
+        customs.move_to_end(key)
+        while len(customs) > MAX_CUSTOM_PROMPTS:
+            customs.popitem(last=False)
+
+    @staticmethod
+    def _capped_customs(data: dict) -> OrderedDict:
+        """把整表自定义提示词规整为受上限约束的 OrderedDict"""
+        customs = OrderedDict(data)
+        while len(customs) > MAX_CUSTOM_PROMPTS:
+            customs.popitem(last=False)
+        return customs
+
+    def save_prompt(self, key: str, content) -> None:
+        """保存单个提示词（支持新增/修改；自定义提示词归入 CUSTOM_PROMPTS 并受 LRU 上限约束）
+
+        key == "CUSTOM_PROMPTS" 为整表替换（content 须为 dict，兼容旧版路由的保存方式）。
+        所有分支都先写日志再改内存：序列化失败时不会留下无法落盘的内存状态。
+        """
+        if key == "CUSTOM_PROMPTS":
+            if not isinstance(content, dict):
+                return
+            customs = self._capped_customs(content)
+            stored = self.user_prompts.get("CUSTOM_PROMPTS")
+            # 跳过无变化保存；但调用方传入的就是存量 dict 本身时可能已被原地改过，
+            # 等值判断分不出来，此时照常落盘
+            if stored == customs and stored is not content:
+                return
+            self._journal_append({"op": "set", "k": key, "v": dict(customs)})
+            self.user_prompts["CUSTOM_PROMPTS"] = customs
+        elif key in self._default_keys:
+            if self.user_prompts.get(key) == content:
+                return  # 内容没变（UI 常见的未编辑失焦保存），跳过整条写路径
+            self._journal_append({"op": "set", "k": key, "v": content})
+            self.user_prompts[key] = content
+        else:
+            if self.user_prompts.get("CUSTOM_PROMPTS", {}).get(key) == content:
+                return
+            self._journal_append({"op": "setc", "k": key, "v": content})
+            self._set_custom(key, content)
+        self._prompt_cache.clear()  # 提示词变更后失效缓存
+        self._all_cache = None
+        self._schedule_flush()
 
     def delete_prompt(self, key: str) -> bool:
         """删除自定义提示词（不允许删除系统默认提示词）"""
-        if key in self.default_prompts:
+        if key in self._default_keys:
             return False  # 系统提示词不允许删除
         if key in self.user_prompts.get("CUSTOM_PROMPTS", {}):
+            self._journal_append({"op": "delc", "k": key})
             del self.user_prompts["CUSTOM_PROMPTS"][key]
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(self.user_prompts, f, ensure_ascii=False, indent=2)
+            self._prompt_cache.clear()
+            self._all_cache = None
+            self._schedule_flush()
             return True
         return False
 
     def reset_prompt(self, key: str) -> None:
         """将提示词重置为默认值"""
-        if key in self.default_prompts:
+        if key in self._default_keys:
+            if self.user_prompts.get(key) == self.default_prompts[key]:
+                return  # 已是默认值，无需写盘
+            self._journal_append({"op": "set", "k": key, "v": self.default_prompts[key]})
             self.user_prompts[key] = self.default_prompts[key]
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(self.user_prompts, f, ensure_ascii=False, indent=2)
+            self._prompt_cache.clear()
+            self._all_cache = None
+            self._schedule_flush()
+
+    def export_pretty(self, path: Path) -> None:
+        """导出带缩进的可读副本（仅供人工查看/备份，不在热路径上）"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.user_prompts, f, ensure_ascii=False, indent=2)
 
     def get_all_prompts(self) -> dict:
-        """获取所有提示词（系统默认+用户自定义）"""
-        return {
-            "system": {k: self.user_prompts[k] for k in self.default_prompts},
-            "custom": self.user_prompts.get("CUSTOM_PROMPTS", {})
-        }
+        """获取所有提示词（系统默认+用户自定义，结果缓存到下一次修改）"""
+        if self._all_cache is None:
+            self._all_cache = {
+                "system": {k: self.user_prompts[k] for k in self.default_prompts},
+                "custom": self.user_prompts.get("CUSTOM_PROMPTS", {})
+            }
+        return self._all_cache
 
     def get_prompt(self, key: str) -> str:
-        """根据key获取提示词内容"""
-        if key in self.default_prompts:
-            return self.user_prompts.get(key, self.default_prompts[key])
-        return self.user_prompts.get("CUSTOM_PROMPTS", {}).get(key, "")
\ No newline at end of file
+        """根据key获取提示词内容（结果缓存，提示词变更时失效）"""
+        cached = self._prompt_cache.get(key)
+        if cached is not None:
+            return cached
+        if key in self._default_keys:
+            prompt = self.user_prompts.get(key, self.default_prompts[key])
+        else:
+            prompt = self.user_prompts.get("CUSTOM_PROMPTS", {}).get(key, "")
+        self._prompt_cache[key] = prompt
+        return prompt
\ No newline at end of file
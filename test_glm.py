@@ -1,27 +1,60 @@
 import asyncio
 import httpx
+import orjson
 
 # 替换为你的API Key
 API_KEY = "92a8517f902a4489bbac76c77f5c4ead.RcnhkzoV6ykoOgfU"
 API_BASE = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
 MODEL = "glm-4-free"
 
+# 请求头/请求体固定不变，模块加载时构建一次（body 直接预序列化成 bytes）
+HEADERS = {
+    "Content-Type": "application/json",
+    "Authorization": f"glm-key {API_KEY}"  # 核心：glm-key前缀
+}
+BODY = orjson.dumps({
+    "model": MODEL,
+    "messages": [{"role": "user", "content": "你好，测试一下"}]
+})
+
+# 模块级连接池：惰性创建、跨调用复用，反复测试时省掉每次 TCP+TLS 握手
+_CLIENT = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """获取共享 AsyncClient（首调时创建）"""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = httpx.AsyncClient(
+            timeout=30.0,
+            http2=True,  # 并发请求复用同一条 TLS 连接（需 httpx[http2] 的 h2 依赖）
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=100),
+        )
+    return _CLIENT
+
+
+async def aclose_client():
+    """关闭共享客户端（事件循环结束前调用）"""
+    global _CLIENT
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+
 
 async def test_glm_api():
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"glm-key {API_KEY}"  # 核心：glm-key前缀
-    }
-    payload = {
-        "model": MODEL,
-        "messages": [{"role": "user", "content": "你好，测试一下"}]
-    }
-
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(API_BASE, json=payload, headers=headers)
+    """发起一次探测请求并返回 Response（不打印，调用方自行处理，便于计时/并发压测）"""
+    client = get_client()
+    return await client.post(API_BASE, content=BODY, headers=HEADERS)
+
+
+async def _main():
+    try:
+        response = await test_glm_api()
         print(f"响应状态码：{response.status_code}")
         print(f"响应内容：{response.text}")
+    finally:
+        await aclose_client()
 
 
 if __name__ == "__main__":
-    asyncio.run(test_glm_api())
\ No newline at end of file
+    asyncio.run(_main())